@@ -9,17 +9,39 @@ Date: November 2025
 
 import os
 import sys
-import argparse
-import json
-import importlib.util
-from datetime import datetime
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
 import logging
 
 # Add utils directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__)))
 from utils.system_utils import OSDetector, LogManager, ConfigManager
 
+# Map distributions to their update module and updater class
+_DEBIAN_UPDATER = ('scripts.debian.auto_update', 'DebianUpdater')
+_ARCH_UPDATER = ('scripts.arch.auto_update', 'ArchUpdater')
+_FEDORA_UPDATER = ('scripts.fedora.auto_update', 'FedoraUpdater')
+_MACOS_UPDATER = ('scripts.macos.auto_update', 'MacOSUpdater')
+
+_DISTRO_UPDATER_MAP = {
+    'debian': _DEBIAN_UPDATER,
+    'ubuntu': _DEBIAN_UPDATER,
+    'arch': _ARCH_UPDATER,
+    'manjaro': _ARCH_UPDATER,
+    'endeavouros': _ARCH_UPDATER,
+    'garuda': _ARCH_UPDATER,
+    'fedora': _FEDORA_UPDATER,
+    'rhel': _FEDORA_UPDATER,
+    'centos': _FEDORA_UPDATER,
+    'rocky': _FEDORA_UPDATER,
+    'alma': _FEDORA_UPDATER,
+    'scientific': _FEDORA_UPDATER,
+    'macos': _MACOS_UPDATER,
+    'darwin': _MACOS_UPDATER
+}
+_SUPPORTED_DISTROS = tuple(_DISTRO_UPDATER_MAP)
+
+# Updater classes already imported in this process, keyed by module path
+_UPDATER_CLASS_CACHE: Dict[str, type] = {}
 
 class AutoUpdateOrchestrator:
     """Main orchestrator for cross-platform automatic updates."""
@@ -34,15 +56,17 @@ class AutoUpdateOrchestrator:
         """
         self.logger = logger or LogManager.setup_logging()
         self.os_info = OSDetector.get_os_info()
+        self._distro_key = self.os_info['distro'].casefold()
         
         # Load configuration
         self.config = self._load_config(config_file)
         
         # Determine update module based on OS
-        self.update_module_path = self._get_update_module_path()
+        self.update_module_path, self._updater_class_name = self._resolve_updater()
+        self._updater_class = None
         
-        self.logger.info(f"Detected OS: {self.os_info['distro']} ({self.os_info['os_type']})")
-        self.logger.info(f"Update module: {self.update_module_path}")
+        self.logger.info("Detected OS: %s (%s)", self.os_info['distro'], self.os_info['os_type'])
+        self.logger.info("Update module: %s", self.update_module_path)
     
     def run_updates(self, **kwargs) -> Dict[str, any]:
         """
@@ -57,16 +81,20 @@ class AutoUpdateOrchestrator:
         self.logger.info("Starting cross-platform update process")
         
         # Merge kwargs with config
-        update_config = self.config.copy()
-        update_config.update(kwargs)
+        update_config = {**self.config, **kwargs}
         
         try:
             # Import and run the appropriate updater
             updater_class = self._import_updater_class()
             updater = updater_class(config=update_config, logger=self.logger)
             
-            # Run the update cycle
-            results = updater.run_update_cycle()
+            # Run the update cycle; updaters holding resources expose close()
+            try:
+                results = updater.run_update_cycle()
+            finally:
+                close = getattr(updater, 'close', None)
+                if close is not None:
+                    close()
             
             # Add orchestrator metadata
             results['orchestrator'] = {
@@ -82,8 +110,9 @@ class AutoUpdateOrchestrator:
             return results
             
         except Exception as e:
-            self.logger.error(f"Update orchestration failed: {e}")
+            self.logger.error("Update orchestration failed: %s", e)
             
+            from datetime import datetime
             error_result = {
                 'timestamp': datetime.now().isoformat(),
                 'overall_status': 'failed',
@@ -115,74 +144,81 @@ class AutoUpdateOrchestrator:
             'timeout_minutes': 60
         }
         
-        if config_file and os.path.exists(config_file):
+        if config_file:
             try:
-                with open(config_file, 'r') as f:
-                    file_config = json.load(f)
+                file_config = self._read_config_file(config_file)
                 
                 # Merge with defaults
                 default_config.update(file_config)
-                self.logger.info(f"Loaded configuration from {config_file}")
+                self.logger.info("Loaded configuration from %s", config_file)
+                return default_config
                 
+            except FileNotFoundError:
+                # Fall through to the default config search below
+                pass
             except Exception as e:
-                self.logger.warning(f"Failed to load config file {config_file}: {e}")
+                self.logger.warning("Failed to load config file %s: %s", config_file, e)
                 self.logger.info("Using default configuration")
+                return default_config
         
-        else:
-            # Try to find default config file
-            default_path = ConfigManager.get_config_path()
-            if os.path.exists(default_path):
-                try:
-                    with open(default_path, 'r') as f:
-                        file_config = json.load(f)
-                    
-                    default_config.update(file_config)
-                    self.logger.info(f"Loaded default configuration from {default_path}")
-                    
-                except Exception as e:
-                    self.logger.warning(f"Failed to load default config: {e}")
-            else:
-                self.logger.info("No configuration file found, using defaults")
+        # Try to find default config file
+        default_path = ConfigManager.get_config_path()
+        try:
+            file_config = self._read_config_file(default_path)
+            
+            default_config.update(file_config)
+            self.logger.info("Loaded default configuration from %s", default_path)
+            
+        except FileNotFoundError:
+            self.logger.info("No configuration file found, using defaults")
+        except Exception as e:
+            self.logger.warning("Failed to load default config: %s", e)
         
         return default_config
     
-    def _get_update_module_path(self) -> str:
+    def _read_config_file(self, config_path: str) -> Dict[str, any]:
         """
-        Determine the appropriate update module path based on OS.
+        Read a JSON configuration file, using orjson when it is installed.
         
+        Args:
+            config_path: Path to configuration file
+            
         Returns:
-            Module path string
+            Parsed configuration dictionary
         """
-        distro = self.os_info['distro'].lower()
-        
-        # Map distributions to update modules
-        module_map = {
-            'debian': 'scripts.debian.auto_update',
-            'ubuntu': 'scripts.debian.auto_update',
-            'arch': 'scripts.arch.auto_update',
-            'manjaro': 'scripts.arch.auto_update',
-            'endeavouros': 'scripts.arch.auto_update',
-            'garuda': 'scripts.arch.auto_update',
-            'fedora': 'scripts.fedora.auto_update',
-            'rhel': 'scripts.fedora.auto_update',
-            'centos': 'scripts.fedora.auto_update',
-            'rocky': 'scripts.fedora.auto_update',
-            'alma': 'scripts.fedora.auto_update',
-            'scientific': 'scripts.fedora.auto_update',
-            'macos': 'scripts.macos.auto_update',
-            'darwin': 'scripts.macos.auto_update'
-        }
+        try:
+            import orjson
+            json_loads = orjson.loads
+        except ImportError:
+            import json
+            json_loads = json.loads
+        
+        with open(config_path, 'rb') as f:
+            return json_loads(f.read())
+    
+    def _resolve_updater(self) -> Tuple[str, str]:
+        """
+        Determine the update module and updater class based on OS.
         
-        module_path = module_map.get(distro)
+        Returns:
+            Tuple of (module path, updater class name)
+        """
+        distro = self._distro_key
+        
+        updater = _DISTRO_UPDATER_MAP.get(distro)
+        
+        if not updater:
+            # Fall back to a token match for IDs like 'almalinux' or 'archarm'
+            updater = next((_DISTRO_UPDATER_MAP[token] for token in _SUPPORTED_DISTROS
+                            if token in distro), None)
         
-        if not module_path:
-            supported_distros = list(module_map.keys())
+        if not updater:
             raise Exception(
                 f"Unsupported distribution: {distro}. "
-                f"Supported distributions: {', '.join(supported_distros)}"
+                f"Supported distributions: {', '.join(_DISTRO_UPDATER_MAP)}"
             )
         
-        return module_path
+        return updater
     
     def _import_updater_class(self):
         """
@@ -191,35 +227,25 @@ class AutoUpdateOrchestrator:
         Returns:
             Updater class
         """
+        if self._updater_class is not None:
+            return self._updater_class
+        
+        cached_class = _UPDATER_CLASS_CACHE.get(self.update_module_path)
+        if cached_class is not None:
+            self._updater_class = cached_class
+            return cached_class
+        
+        import importlib
+        
         try:
-            # Map module paths to class names
-            class_map = {
-                'scripts.debian.auto_update': 'DebianUpdater',
-                'scripts.arch.auto_update': 'ArchUpdater',
-                'scripts.fedora.auto_update': 'FedoraUpdater',
-                'scripts.macos.auto_update': 'MacOSUpdater'
-            }
-            
-            class_name = class_map.get(self.update_module_path)
-            if not class_name:
-                raise Exception(f"No class mapping for module: {self.update_module_path}")
-            
-            # Convert module path to file path
-            module_file = self.update_module_path.replace('.', '/') + '.py'
-            module_file = os.path.join(os.path.dirname(__file__), module_file)
-            
-            if not os.path.exists(module_file):
-                raise Exception(f"Update module not found: {module_file}")
-            
-            # Import the module
-            spec = importlib.util.spec_from_file_location(
-                self.update_module_path, module_file
-            )
-            module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(module)
+            # Import the module (sys.modules short-circuits repeat imports)
+            module = (sys.modules.get(self.update_module_path) or
+                      importlib.import_module(self.update_module_path))
             
             # Get the updater class
-            updater_class = getattr(module, class_name)
+            updater_class = getattr(module, self._updater_class_name)
+            _UPDATER_CLASS_CACHE[self.update_module_path] = updater_class
+            self._updater_class = updater_class
             
             return updater_class
             
@@ -233,31 +259,29 @@ class AutoUpdateOrchestrator:
         Args:
             results: Results dictionary
         """
-        status = results.get('overall_status', 'unknown')
+        get = results.get
+        status = get('overall_status', 'unknown')
         
-        self.logger.info(f"Update process completed with status: {status.upper()}")
+        self.logger.info("Update process completed with status: %s", status.upper())
         
         # Log health check results
-        if 'pre_update_health' in results:
-            pre_health = results['pre_update_health']['overall_status']
-            self.logger.info(f"Pre-update health check: {pre_health}")
+        pre_health = get('pre_update_health')
+        if pre_health is not None:
+            self.logger.info("Pre-update health check: %s", pre_health['overall_status'])
         
-        if 'post_update_health' in results:
-            post_health = results['post_update_health']['overall_status']
-            self.logger.info(f"Post-update health check: {post_health}")
+        post_health = get('post_update_health')
+        if post_health is not None:
+            self.logger.info("Post-update health check: %s", post_health['overall_status'])
         
         # Log update counts
-        if 'available_updates' in results:
-            updates = results['available_updates']
-            if isinstance(updates, dict):
-                total = updates.get('total_updates', 0)
-                security = updates.get('security_updates', 0)
-                self.logger.info(f"Updates processed - Total: {total}, Security: {security}")
+        updates = get('available_updates')
+        if isinstance(updates, dict):
+            total = updates.get('total_updates', 0)
+            security = updates.get('security_updates', 0)
+            self.logger.info("Updates processed - Total: %s, Security: %s", total, security)
         
         # Log reboot/restart requirement
-        reboot_required = (results.get('reboot_required') or 
-                          results.get('restart_required', False))
-        if reboot_required:
+        if get('reboot_required') or get('restart_required', False):
             self.logger.warning("System reboot/restart is required")
     
     def get_supported_distributions(self) -> Dict[str, str]:
@@ -281,7 +305,7 @@ class AutoUpdateOrchestrator:
         Returns:
             Dictionary with prerequisite check results
         """
-        distro = self.os_info['distro'].lower()
+        distro = self._distro_key
         results = {
             'os_supported': OSDetector.is_supported_distro(distro),
             'checks': {}
@@ -312,6 +336,8 @@ class AutoUpdateOrchestrator:
 
 def main():
     """Main function for command-line execution."""
+    import argparse
+    
     parser = argparse.ArgumentParser(
         description='Cross-platform automatic update orchestrator',
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -443,40 +469,40 @@ Examples:
         results = orchestrator.run_updates(**update_kwargs)
         
         # Print summary
+        get = results.get
+        detected_os = results['orchestrator']['detected_os']
         print(f"\n{'='*50}")
         print(f"System Update Results")
         print(f"{'='*50}")
-        print(f"OS: {results['orchestrator']['detected_os']['distro']} "
-              f"({results['orchestrator']['detected_os']['os_type']})")
+        print(f"OS: {detected_os['distro']} ({detected_os['os_type']})")
         print(f"Status: {results['overall_status'].upper()}")
         print(f"Timestamp: {results['timestamp']}")
         
         # Print update-specific information
-        if 'available_updates' in results:
-            updates = results['available_updates']
-            if isinstance(updates, dict):
-                print(f"Updates Available: {updates.get('total_updates', 'unknown')}")
-                if 'security_updates' in updates:
-                    print(f"Security Updates: {updates['security_updates']}")
+        updates = get('available_updates')
+        if isinstance(updates, dict):
+            print(f"Updates Available: {updates.get('total_updates', 'unknown')}")
+            security_updates = updates.get('security_updates')
+            if security_updates is not None:
+                print(f"Security Updates: {security_updates}")
         
         # Print health check status
-        if 'pre_update_health' in results:
-            pre_status = results['pre_update_health']['overall_status']
-            print(f"Pre-update Health: {pre_status}")
+        pre_health = get('pre_update_health')
+        if pre_health is not None:
+            print(f"Pre-update Health: {pre_health['overall_status']}")
         
-        if 'post_update_health' in results:
-            post_status = results['post_update_health']['overall_status']
-            print(f"Post-update Health: {post_status}")
+        post_health = get('post_update_health')
+        if post_health is not None:
+            print(f"Post-update Health: {post_health['overall_status']}")
         
         # Print reboot warning
-        reboot_required = (results.get('reboot_required') or 
-                          results.get('restart_required', False))
-        if reboot_required:
+        if get('reboot_required') or get('restart_required', False):
             print("\n⚠️  SYSTEM REBOOT/RESTART REQUIRED ⚠️")
         
         # Print error if present
-        if 'error' in results:
-            print(f"\nError: {results['error']}")
+        error = get('error')
+        if error is not None:
+            print(f"\nError: {error}")
         
         print(f"{'='*50}")
         
@@ -489,7 +515,7 @@ Examples:
         sys.exit(130)
     
     except Exception as e:
-        logger.error(f"Update orchestration failed: {e}")
+        logger.error("Update orchestration failed: %s", e)
         sys.exit(1)
 
 
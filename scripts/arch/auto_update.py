@@ -9,27 +9,111 @@ Date: November 2025
 
 import os
 import sys
+import shutil
 import subprocess
 import json
+import tempfile
+import hashlib
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass, field, fields
+from typing import Dict, List, Optional, Tuple, Union
 import logging
 
+try:
+    import requests
+    HAS_REQUESTS = True
+except ImportError:
+    HAS_REQUESTS = False
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 # Add parent directories to path for imports
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 from utils.system_utils import OSDetector, CommandRunner, LogManager
 from scripts.common.health_checks import HealthChecker
 
+PACMAN_CONF_PATH = '/etc/pacman.conf'
+
+# Supported AUR helpers in detection order
+AUR_HELPERS = ('yay', 'paru', 'trizen', 'pikaur')
+
+# Printed by pacman -Syu when the system is already up to date
+PACMAN_NOTHING_TO_DO = 'there is nothing to do'
+
+# Environment for pacman runs whose output is parsed: untranslated messages
+PACMAN_ENV = {'LC_ALL': 'C'}
+
+# Mirror list written by reflector and the fingerprint of the last run
+MIRRORLIST_PATH = '/etc/pacman.d/mirrorlist'
+MIRRORLIST_CACHE_FILE = '/var/cache/system-scripts/arch_mirrorlist.json'
+
+# Countries used for mirrors when none are configured or detected
+DEFAULT_MIRROR_COUNTRIES = ('United States', 'Canada', 'Germany', 'France', 'United Kingdom')
+ZONE_TAB_PATH = '/usr/share/zoneinfo/zone.tab'
+
+# A cached mirror list is reused only if one of its top mirrors answers within this
+MIRROR_PROBE_MAX_MS = 250
+MIRROR_PROBE_COUNT = 5
+MIRROR_POOL_SIZE = 32
+
+# Marks the end of the orphan list in the combined cleanup output
+CLEANUP_DELIMITER = '---SYSTEM-SCRIPTS-ORPHANS-END---'
+
+# Seconds a health check result may be reused within one update cycle
+HEALTH_CHECK_TTL_SECONDS = 300
+
+# Health checks whose results a package update can change; a new kernel,
+# firewall or resolver package can affect network reachability too
+INVALIDATED_BY_UPDATE = {'disk_space', 'memory_usage', 'load_average', 'services', 'ports',
+                         'network'}
+
+
+@dataclass
+class ArchUpdaterConfig:
+    """Configuration for ArchUpdater with its default values."""
+    
+    update_system: bool = True
+    update_aur: bool = False
+    aur_helper: str = 'yay'  # yay, paru, trizen, or pikaur
+    auto_resolve_conflicts: bool = False
+    clean_cache: bool = True
+    clean_orphans: bool = True
+    check_mirrors: bool = True
+    update_mirrorlist: bool = False
+    mirrorlist_max_age_days: int = 7
+    mirror_countries: List[str] = field(default_factory=list)  # empty = detect from timezone
+    backup_pacman_db: bool = True
+    separate_sync_and_upgrade: bool = False
+    report_pending_updates: Optional[bool] = None  # None = only when run interactively
+    ignore_packages: List[str] = field(default_factory=list)
+    pre_update_health_check: bool = True
+    post_update_health_check: bool = True
+    max_parallel_downloads: Optional[int] = None  # None = leave pacman.conf alone
+    timeout_minutes: int = 60
+
+
+ARCH_CONFIG_FIELDS = frozenset(f.name for f in fields(ArchUpdaterConfig))
+
 
 class ArchUpdater:
     """Handles automatic updates for Arch Linux systems."""
     
-    def __init__(self, config: Optional[Dict] = None, logger: Optional[logging.Logger] = None):
+    # PATH lookups for AUR helpers, shared across instances
+    _helper_paths: Dict[str, Optional[str]] = {}
+    
+    def __init__(self, config: Optional[Union[Dict, 'ArchUpdaterConfig']] = None, logger: Optional[logging.Logger] = None):
         """
         Initialize the Arch updater.
         
         Args:
-            config: Configuration dictionary
+            config: Configuration dictionary or ArchUpdaterConfig
             logger: Logger instance
         """
         self.logger = logger or LogManager.setup_logging()
@@ -40,29 +124,21 @@ class ArchUpdater:
             raise Exception(f"This script is for Arch-based systems only. "
                           f"Detected: {self.os_info['distro']}")
         
-        # Default configuration
-        self.config = {
-            'update_system': True,
-            'update_aur': False,
-            'aur_helper': 'yay',  # yay, paru, or trizen
-            'auto_resolve_conflicts': False,
-            'clean_cache': True,
-            'clean_orphans': True,
-            'check_mirrors': True,
-            'update_mirrorlist': False,
-            'backup_pacman_db': True,
-            'ignore_packages': [],
-            'pre_update_health_check': True,
-            'post_update_health_check': True,
-            'max_parallel_downloads': 5,
-            'timeout_minutes': 60
-        }
-        
-        if config:
-            self.config.update(config)
+        # Accept a ready-made config or a dict of overrides; unknown keys
+        # (e.g. settings for other platforms) are ignored
+        if isinstance(config, ArchUpdaterConfig):
+            self.config = config
+        else:
+            self.config = ArchUpdaterConfig(**{
+                key: value for key, value in (config or {}).items()
+                if key in ARCH_CONFIG_FIELDS
+            })
         
-        self.health_checker = HealthChecker(self.logger)
+        self.health_checker = HealthChecker(self.logger, ttl_seconds=HEALTH_CHECK_TTL_SECONDS)
         self.aur_helper = self._detect_aur_helper()
+        self._aur_update_cmd = ([self.aur_helper, '-Sua', '--noconfirm']
+                                if self.aur_helper in AUR_HELPERS else None)
+        self._package_counts = None
     
     def run_update_cycle(self) -> Dict[str, any]:
         """
@@ -88,7 +164,7 @@ class ArchUpdater:
         
         try:
             # Pre-update health check
-            if self.config['pre_update_health_check']:
+            if self.config.pre_update_health_check:
                 self.logger.info("Running pre-update health check")
                 results['pre_update_health'] = self.health_checker.run_all_checks()
                 
@@ -97,54 +173,94 @@ class ArchUpdater:
                     results['overall_status'] = 'aborted'
                     return results
             
-            # Backup pacman database
-            if self.config['backup_pacman_db']:
-                self.logger.info("Backing up pacman database")
-                self._backup_pacman_database()
-            
-            # Update mirror list if configured
-            if self.config['update_mirrorlist']:
-                self.logger.info("Updating mirror list")
-                self._update_mirrorlist()
-            
-            # Sync package databases
-            self.logger.info("Synchronizing package databases")
-            results['database_sync'] = self._sync_databases()
-            
-            # Check for available updates
-            self.logger.info("Checking for available updates")
-            results['available_updates'] = self._check_available_updates()
-            
-            if not results['available_updates']['has_updates'] and not self.config['update_aur']:
-                self.logger.info("No updates available")
-                results['overall_status'] = 'no_updates'
-            else:
-                # Update system packages
-                if self.config['update_system'] and results['available_updates']['has_updates']:
-                    self.logger.info("Updating system packages")
-                    results['system_update'] = self._update_system_packages()
+            # Backup pacman database and update the mirror list concurrently;
+            # both are independent and must finish before the database sync
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                pending = []
+                
+                if self.config.backup_pacman_db:
+                    self.logger.info("Backing up pacman database")
+                    pending.append(executor.submit(self._backup_pacman_database))
+                
+                # Update mirror list if configured
+                if self.config.update_mirrorlist:
+                    self.logger.info("Updating mirror list")
+                    pending.append(executor.submit(self._update_mirrorlist))
                 
-                # Update AUR packages
-                if self.config['update_aur'] and self.aur_helper:
+                for future in pending:
+                    future.result()
+            
+            report_pending = self.config.report_pending_updates
+            if report_pending is None:
+                report_pending = sys.stdin.isatty()
+            
+            if not report_pending and self.config.update_system:
+                # Unattended run: let pacman -Syu decide whether anything is out
+                # of date instead of listing pending updates first
+                self._apply_parallel_downloads()
+                self.logger.info("Synchronizing package databases and updating system packages")
+                results['system_update'] = self._update_system_packages(sync=True)
+                
+                has_updates = (results['system_update']['status'] != 'success' or
+                               PACMAN_NOTHING_TO_DO not in results['system_update']['stdout'])
+                results['available_updates'] = {
+                    'has_updates': has_updates,
+                    'note': 'Pending updates not listed (unattended run)'
+                }
+                
+                if not has_updates and not self.config.update_aur:
+                    self.logger.info("No updates available")
+                    results['overall_status'] = 'no_updates'
+                elif self.config.update_aur and self.aur_helper:
                     self.logger.info("Updating AUR packages")
                     results['aur_update'] = self._update_aur_packages()
+            else:
+                if self.config.separate_sync_and_upgrade:
+                    # Sync package databases
+                    self.logger.info("Synchronizing package databases")
+                    results['database_sync'] = self._sync_databases()
+                    
+                    # Check for available updates
+                    self.logger.info("Checking for available updates")
+                    results['available_updates'] = self._check_available_updates()
+                else:
+                    # Sync and list pending updates in a single pacman run
+                    self.logger.info("Synchronizing package databases and checking for updates")
+                    results['database_sync'], results['available_updates'] = \
+                        self._sync_and_check_updates()
+                
+                if not results['available_updates']['has_updates'] and not self.config.update_aur:
+                    self.logger.info("No updates available")
+                    results['overall_status'] = 'no_updates'
+                else:
+                    # Update system packages
+                    if self.config.update_system and results['available_updates']['has_updates']:
+                        self._apply_parallel_downloads()
+                        self.logger.info("Updating system packages")
+                        results['system_update'] = self._update_system_packages()
+                    
+                    # Update AUR packages
+                    if self.config.update_aur and self.aur_helper:
+                        self.logger.info("Updating AUR packages")
+                        results['aur_update'] = self._update_aur_packages()
             
             # Cleanup
-            if self.config['clean_cache'] or self.config['clean_orphans']:
+            if self.config.clean_cache or self.config.clean_orphans:
                 self.logger.info("Running cleanup tasks")
                 results['cleanup'] = self._cleanup_system()
             
             # Post-update health check
-            if self.config['post_update_health_check']:
+            if self.config.post_update_health_check:
                 self.logger.info("Running post-update health check")
+                self.health_checker.invalidate_cache(INVALIDATED_BY_UPDATE)
                 results['post_update_health'] = self.health_checker.run_all_checks()
             
         except Exception as e:
-            self.logger.error(f"Update cycle failed: {e}")
+            self.logger.error("Update cycle failed: %s", e)
             results['overall_status'] = 'failed'
             results['error'] = str(e)
         
-        self.logger.info(f"Update cycle completed with status: {results['overall_status']}")
+        self.logger.info("Update cycle completed with status: %s", results['overall_status'])
         return results
     
     def _detect_aur_helper(self) -> Optional[str]:
@@ -154,33 +270,54 @@ class ArchUpdater:
         Returns:
             Name of available AUR helper or None
         """
-        helpers = ['yay', 'paru', 'trizen', 'pikaur']
+        if not self.config.update_aur:
+            return None
+        
+        # Try the configured helper first
+        helpers = list(AUR_HELPERS)
+        preferred = self.config.aur_helper
+        if preferred in helpers:
+            helpers.remove(preferred)
+            helpers.insert(0, preferred)
         
         for helper in helpers:
-            if CommandRunner.is_command_available(helper):
-                self.logger.info(f"Found AUR helper: {helper}")
+            if helper not in ArchUpdater._helper_paths:
+                ArchUpdater._helper_paths[helper] = shutil.which(helper)
+            if ArchUpdater._helper_paths[helper]:
+                self.logger.info("Found AUR helper: %s", helper)
                 return helper
         
-        if self.config['update_aur']:
-            self.logger.warning("AUR updates requested but no AUR helper found")
+        self.logger.warning("AUR updates requested but no AUR helper found")
         
         return None
     
     def _backup_pacman_database(self):
         """Backup the pacman database."""
         try:
-            backup_dir = f"/tmp/pacman_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            # /var/tmp usually shares a filesystem with /var/lib, which lets the
+            # backup be a hardlink snapshot instead of a full copy
+            backup_dir = f"/var/tmp/pacman_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
             os.makedirs(backup_dir, exist_ok=True)
             
             # Backup pacman database
-            CommandRunner.run_command([
-                'sudo', 'cp', '-r', '/var/lib/pacman/local', backup_dir
-            ])
+            try:
+                CommandRunner.run_command([
+                    'sudo', 'cp', '-al', '/var/lib/pacman/local', backup_dir
+                ])
+            except subprocess.CalledProcessError:
+                # Hardlinks fail across filesystems; fall back to a real copy
+                self.logger.debug("Hardlink backup failed, copying pacman database")
+                CommandRunner.run_command([
+                    'sudo', 'rm', '-rf', os.path.join(backup_dir, 'local')
+                ])
+                CommandRunner.run_command([
+                    'sudo', 'cp', '-r', '/var/lib/pacman/local', backup_dir
+                ])
             
-            self.logger.info(f"Pacman database backed up to {backup_dir}")
+            self.logger.info("Pacman database backed up to %s", backup_dir)
             
         except Exception as e:
-            self.logger.warning(f"Could not backup pacman database: {e}")
+            self.logger.warning("Could not backup pacman database: %s", e)
     
     def _update_mirrorlist(self) -> Dict[str, any]:
         """
@@ -193,15 +330,33 @@ class ArchUpdater:
             if not CommandRunner.is_command_available('reflector'):
                 return {'status': 'skipped', 'reason': 'reflector not available'}
             
-            # Use reflector to update mirrors
-            code, stdout, stderr = CommandRunner.run_command([
-                'sudo', 'reflector',
-                '--country', 'United States,Canada,Germany,France,United Kingdom',
+            countries = self.config.mirror_countries or self._detect_mirror_countries()
+            
+            # Only keep recently synced, fully mirrored servers before rating them
+            reflector_args = [
+                '--country', ','.join(countries),
                 '--protocol', 'https',
+                '--age', '24',
+                '--completion-percent', '100',
                 '--latest', '10',
-                '--sort', 'rate',
-                '--save', '/etc/pacman.d/mirrorlist'
-            ], timeout=300)
+                '--score', '5',
+                '--fastest', '5',
+                '--sort', 'rate'
+            ]
+            args_hash = hashlib.sha256(json.dumps(reflector_args).encode()).hexdigest()
+            
+            # Skip reflector's mirror scoring when the last result is still good
+            if self._is_mirrorlist_cache_valid(args_hash):
+                self.logger.info("Mirror list is recent and its top mirror responds, skipping reflector")
+                return {'status': 'cached'}
+            
+            # Use reflector to update mirrors
+            code, stdout, stderr = CommandRunner.run_command(
+                ['sudo', 'reflector'] + reflector_args + ['--save', MIRRORLIST_PATH],
+                timeout=300
+            )
+            
+            self._write_mirrorlist_cache(args_hash)
             
             return {
                 'status': 'success',
@@ -210,9 +365,187 @@ class ArchUpdater:
             }
             
         except Exception as e:
-            self.logger.warning(f"Failed to update mirrorlist: {e}")
+            self.logger.warning("Failed to update mirrorlist: %s", e)
             return {'status': 'failed', 'error': str(e)}
     
+    def _detect_mirror_countries(self) -> List[str]:
+        """
+        Guess the mirror country from the system timezone.
+        
+        Returns:
+            List of reflector country names or codes
+        """
+        try:
+            timezone = None
+            if os.path.exists('/etc/timezone'):
+                with open('/etc/timezone', 'r') as f:
+                    timezone = f.read().strip()
+            elif os.path.islink('/etc/localtime'):
+                timezone = os.readlink('/etc/localtime').split('zoneinfo/', 1)[-1]
+            
+            if timezone:
+                with open(ZONE_TAB_PATH, 'r') as f:
+                    for line in f:
+                        if line.startswith('#'):
+                            continue
+                        fields = line.split('\t')
+                        if len(fields) >= 3 and fields[2].strip() == timezone:
+                            return [fields[0]]
+                            
+        except OSError as e:
+            self.logger.debug("Could not detect mirror country from timezone: %s", e)
+        
+        return list(DEFAULT_MIRROR_COUNTRIES)
+    
+    def _is_mirrorlist_cache_valid(self, args_hash: str) -> bool:
+        """
+        Check whether the last reflector run can be reused.
+        
+        Args:
+            args_hash: Fingerprint of the reflector arguments
+            
+        Returns:
+            True if the cached mirror list is recent, matches the arguments,
+            and one of its top mirrors answers quickly
+        """
+        try:
+            with open(MIRRORLIST_CACHE_FILE, 'r') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return False
+        
+        max_age = self.config.mirrorlist_max_age_days * 86400
+        if cache.get('args_hash') != args_hash:
+            return False
+        if time.time() - cache.get('written_at', 0) >= max_age:
+            return False
+        
+        top_mirrors = cache.get('top_mirrors')
+        if not top_mirrors:
+            return False
+        
+        latencies = [ms for ms in self._probe_mirrors(top_mirrors).values() if ms is not None]
+        return bool(latencies) and min(latencies) < MIRROR_PROBE_MAX_MS
+    
+    def _write_mirrorlist_cache(self, args_hash: str):
+        """
+        Record the reflector fingerprint and best mirrors of the saved mirror list.
+        
+        Args:
+            args_hash: Fingerprint of the reflector arguments
+        """
+        try:
+            servers = []
+            with open(MIRRORLIST_PATH, 'r') as f:
+                for line in f:
+                    key, _, value = line.partition('=')
+                    if key.strip() == 'Server' and value.strip():
+                        servers.append(value.strip())
+                        if len(servers) >= MIRROR_PROBE_COUNT:
+                            break
+            
+            top_mirrors = self._select_mirrors(self._probe_mirrors(servers)) or servers[:1]
+            content = json.dumps({
+                'args_hash': args_hash,
+                'written_at': time.time(),
+                'top_mirrors': top_mirrors
+            })
+            
+            if os.geteuid() == 0:
+                os.makedirs(os.path.dirname(MIRRORLIST_CACHE_FILE), exist_ok=True)
+                with open(MIRRORLIST_CACHE_FILE, 'w') as f:
+                    f.write(content)
+            else:
+                # The cache directory is root's, like the mirror list reflector
+                # just saved; stage the file and place it with one sudo install
+                fd, temp_path = tempfile.mkstemp(prefix='arch_mirrorlist.')
+                try:
+                    with os.fdopen(fd, 'w') as f:
+                        f.write(content)
+                    CommandRunner.run_command(
+                        ['sudo', 'install', '-D', '-m', '644', temp_path, MIRRORLIST_CACHE_FILE])
+                finally:
+                    os.unlink(temp_path)
+                
+        except (OSError, subprocess.SubprocessError) as e:
+            self.logger.warning("Could not write mirror list cache: %s", e)
+    
+    def _select_mirrors(self, latencies: Dict[str, Optional[float]]) -> List[str]:
+        """
+        Pick the mirrors that are within 10% of the second fastest one.
+        
+        Comparing against the runner-up rather than the single fastest mirror
+        spreads load instead of always pinning one server.
+        
+        Args:
+            latencies: Mapping of server URL to probe latency in milliseconds
+            
+        Returns:
+            Server URLs ordered fastest first
+        """
+        ranked = sorted((ms, server) for server, ms in latencies.items() if ms is not None)
+        if not ranked:
+            return []
+        
+        cutoff = ranked[min(1, len(ranked) - 1)][0] * 1.1
+        return [server for ms, server in ranked if ms <= cutoff]
+    
+    def _probe_mirrors(self, servers: List[str]) -> Dict[str, Optional[float]]:
+        """
+        Probe several mirrors concurrently over a shared connection pool.
+        
+        Args:
+            servers: Server URLs from the mirrorlist
+            
+        Returns:
+            Mapping of server URL to latency in milliseconds (None on failure)
+        """
+        if not servers:
+            return {}
+        
+        session = None
+        if HAS_REQUESTS:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_maxsize=MIRROR_POOL_SIZE)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+        
+        try:
+            with ThreadPoolExecutor(max_workers=min(MIRROR_POOL_SIZE, len(servers))) as executor:
+                latencies = executor.map(lambda server: self._probe_mirror(server, session), servers)
+                return dict(zip(servers, latencies))
+        finally:
+            if session is not None:
+                session.close()
+    
+    def _probe_mirror(self, server: str, session=None) -> Optional[float]:
+        """
+        Measure how quickly a mirror serves the core database headers.
+        
+        Args:
+            server: Server URL from the mirrorlist (may contain $repo/$arch)
+            session: Optional requests session whose connections are reused
+            
+        Returns:
+            Response time in milliseconds, or None if the probe failed
+        """
+        url = server.replace('$repo', 'core').replace('$arch', os.uname().machine)
+        url = url.rstrip('/') + '/core.db'
+        
+        try:
+            start_time = time.monotonic()
+            if session is not None:
+                response = session.head(url, timeout=(1, 2))
+                response.raise_for_status()
+            else:
+                request = urllib.request.Request(url, method='HEAD')
+                with urllib.request.urlopen(request, timeout=2):
+                    pass
+            return (time.monotonic() - start_time) * 1000
+        except Exception as e:
+            self.logger.debug("Mirror probe failed for %s: %s", url, e)
+            return None
+    
     def _sync_databases(self) -> Dict[str, any]:
         """
         Synchronize package databases.
@@ -235,13 +568,67 @@ class ArchUpdater:
             }
             
         except subprocess.CalledProcessError as e:
-            self.logger.error(f"Failed to sync databases: {e}")
+            self.logger.error("Failed to sync databases: %s", e)
             return {
                 'status': 'failed',
                 'error': str(e),
                 'return_code': e.returncode
             }
     
+    def _sync_and_check_updates(self) -> Tuple[Dict[str, any], Dict[str, any]]:
+        """
+        Synchronize package databases and list pending updates in one pacman run.
+        
+        `pacman -Syup` refreshes the sync databases and prints the upgrade set
+        without installing it, so the following `pacman -Su` can reuse the
+        fresh databases instead of loading them twice more.
+        
+        Returns:
+            Tuple of (database sync results, available updates information)
+        """
+        cmd = ['sudo', 'pacman', '-Syup', '--print-format', '%n']
+        for pkg in self.config.ignore_packages:
+            cmd.extend(['--ignore', pkg])
+        
+        try:
+            code, stdout, stderr = CommandRunner.run_command(cmd, timeout=300)
+        except subprocess.CalledProcessError as e:
+            self.logger.error("Failed to sync databases: %s", e)
+            sync_result = {
+                'status': 'failed',
+                'error': str(e),
+                'return_code': e.returncode
+            }
+            return sync_result, {'has_updates': False, 'error': str(e)}
+        
+        sync_result = {
+            'status': 'success',
+            'return_code': code,
+            'stdout': stdout,
+            'stderr': stderr
+        }
+        
+        # Package names are bare tokens; progress lines start with ':' or a space
+        official_updates = []
+        official_count = 0
+        for line in stdout.splitlines():
+            if line and not line.startswith((':', ' ')) and ' ' not in line:
+                official_count += 1
+                if len(official_updates) < 20:
+                    official_updates.append(line)
+        
+        aur_updates = []
+        if self.aur_helper and self.config.update_aur:
+            aur_updates = self._check_aur_updates()
+        
+        return sync_result, {
+            'has_updates': official_count > 0 or len(aur_updates) > 0,
+            'official_updates': official_count,
+            'aur_updates': len(aur_updates),
+            'official_packages': official_updates,  # Limited to first 20
+            'aur_packages': aur_updates[:20]
+        }
+    
     def _check_available_updates(self) -> Dict[str, any]:
         """
         Check for available package updates.
@@ -250,37 +637,31 @@ class ArchUpdater:
             Dictionary with available updates information
         """
         try:
-            # Check for official repository updates
-            code, stdout, stderr = CommandRunner.run_command(
-                ['pacman', '-Qu'],
-                check_return_code=False
-            )
-            
+            # Check for official repository updates, keeping only the first 20 names
             official_updates = []
-            if code == 0 and stdout.strip():
-                lines = stdout.strip().split('\n')
-                for line in lines:
-                    if line.strip():
-                        parts = line.split()
-                        if len(parts) >= 2:
-                            package_name = parts[0]
-                            official_updates.append(package_name)
+            official_count = 0
+            for line in CommandRunner.stream_lines(['pacman', '-Qu']):
+                package_name, _, version = line.strip().partition(' ')
+                if package_name and version:
+                    official_count += 1
+                    if len(official_updates) < 20:
+                        official_updates.append(package_name)
             
             # Check for AUR updates if AUR helper is available
             aur_updates = []
-            if self.aur_helper and self.config['update_aur']:
+            if self.aur_helper and self.config.update_aur:
                 aur_updates = self._check_aur_updates()
             
             return {
-                'has_updates': len(official_updates) > 0 or len(aur_updates) > 0,
-                'official_updates': len(official_updates),
+                'has_updates': official_count > 0 or len(aur_updates) > 0,
+                'official_updates': official_count,
                 'aur_updates': len(aur_updates),
-                'official_packages': official_updates[:20],  # Limit to first 20
+                'official_packages': official_updates,  # Limited to first 20
                 'aur_packages': aur_updates[:20]
             }
             
         except Exception as e:
-            self.logger.error(f"Failed to check available updates: {e}")
+            self.logger.error("Failed to check available updates: %s", e)
             return {
                 'has_updates': False,
                 'error': str(e)
@@ -297,61 +678,92 @@ class ArchUpdater:
             if not self.aur_helper:
                 return []
             
-            # Different AUR helpers have different commands
-            if self.aur_helper in ['yay', 'paru']:
-                code, stdout, stderr = CommandRunner.run_command(
-                    [self.aur_helper, '-Qua'],
-                    check_return_code=False,
-                    timeout=120
-                )
-            else:  # trizen, pikaur
-                code, stdout, stderr = CommandRunner.run_command(
-                    [self.aur_helper, '-Qua'],
-                    check_return_code=False,
-                    timeout=120
-                )
+            # All supported AUR helpers share pacman's -Qua syntax
+            code, stdout, stderr = CommandRunner.run_command(
+                [self.aur_helper, '-Qua'],
+                check_return_code=False,
+                timeout=120
+            )
             
             aur_packages = []
-            if code == 0 and stdout.strip():
-                lines = stdout.strip().split('\n')
-                for line in lines:
-                    if line.strip():
-                        parts = line.split()
-                        if len(parts) >= 1:
-                            package_name = parts[0]
-                            aur_packages.append(package_name)
+            if code == 0:
+                for line in stdout.splitlines():
+                    package_name = line.strip().partition(' ')[0]
+                    if package_name:
+                        aur_packages.append(package_name)
             
             return aur_packages
             
         except Exception as e:
-            self.logger.warning(f"Could not check AUR updates: {e}")
+            self.logger.warning("Could not check AUR updates: %s", e)
             return []
     
-    def _update_system_packages(self) -> Dict[str, any]:
+    def _apply_parallel_downloads(self):
+        """
+        Make pacman.conf use the configured ParallelDownloads value.
+        
+        pacman.conf is only edited when max_parallel_downloads is set, and
+        then only when the active setting differs, so repeat runs leave it
+        untouched.
+        """
+        downloads = self.config.max_parallel_downloads
+        if not downloads:
+            return
+        
+        try:
+            current = None
+            has_entry = False
+            with open(PACMAN_CONF_PATH, 'r') as f:
+                for line in f:
+                    key, _, value = line.strip().lstrip('#').partition('=')
+                    if key.strip() == 'ParallelDownloads':
+                        has_entry = True
+                        if not line.lstrip().startswith('#'):
+                            current = value.strip()
+            
+            if current == str(int(downloads)):
+                return
+            
+            setting = f"ParallelDownloads = {int(downloads)}"
+            if has_entry:
+                sed_expr = f"s/^#\\?[[:space:]]*ParallelDownloads[[:space:]]*=.*/{setting}/"
+            else:
+                sed_expr = f"/^\\[options\\]/a {setting}"
+            
+            CommandRunner.run_command(['sudo', 'sed', '-i', sed_expr, PACMAN_CONF_PATH])
+            self.logger.info("Set %s in %s", setting, PACMAN_CONF_PATH)
+            
+        except Exception as e:
+            self.logger.warning("Could not apply ParallelDownloads setting: %s", e)
+    
+    def _update_system_packages(self, sync: bool = False) -> Dict[str, any]:
         """
         Update official repository packages.
         
+        Args:
+            sync: Also synchronize package databases (pacman -Syu)
+            
         Returns:
             Dictionary with update results
         """
         try:
             # Build pacman command
-            cmd = ['sudo', 'pacman', '-Su', '--noconfirm']
+            cmd = ['sudo', 'pacman', '-Syu' if sync else '-Su', '--noconfirm']
             
             # Add ignored packages
-            if self.config['ignore_packages']:
-                for pkg in self.config['ignore_packages']:
+            if self.config.ignore_packages:
+                for pkg in self.config.ignore_packages:
                     cmd.extend(['--ignore', pkg])
             
             # Handle conflict resolution
-            if not self.config['auto_resolve_conflicts']:
+            if not self.config.auto_resolve_conflicts:
                 # Remove --noconfirm to allow manual conflict resolution
                 cmd.remove('--noconfirm')
             
-            # Run the update
-            timeout = self.config['timeout_minutes'] * 60
+            # Run the update; the output is matched against PACMAN_NOTHING_TO_DO
+            timeout = self.config.timeout_minutes * 60
             code, stdout, stderr = CommandRunner.run_command(
-                cmd, timeout=timeout
+                cmd, timeout=timeout, env=PACMAN_ENV
             )
             
             return {
@@ -362,7 +774,7 @@ class ArchUpdater:
             }
             
         except subprocess.CalledProcessError as e:
-            self.logger.error(f"System package update failed: {e}")
+            self.logger.error("System package update failed: %s", e)
             return {
                 'status': 'failed',
                 'error': str(e),
@@ -382,24 +794,16 @@ class ArchUpdater:
             if not self.aur_helper:
                 return {'status': 'skipped', 'reason': 'No AUR helper available'}
             
-            # Build AUR helper command
-            if self.aur_helper == 'yay':
-                cmd = ['yay', '-Sua', '--noconfirm']
-            elif self.aur_helper == 'paru':
-                cmd = ['paru', '-Sua', '--noconfirm']
-            elif self.aur_helper == 'trizen':
-                cmd = ['trizen', '-Sua', '--noconfirm']
-            elif self.aur_helper == 'pikaur':
-                cmd = ['pikaur', '-Sua', '--noconfirm']
-            else:
+            if self._aur_update_cmd is None:
                 return {'status': 'skipped', 'reason': f'Unsupported AUR helper: {self.aur_helper}'}
+            cmd = list(self._aur_update_cmd)
             
             # Handle conflict resolution
-            if not self.config['auto_resolve_conflicts']:
+            if not self.config.auto_resolve_conflicts:
                 cmd.remove('--noconfirm')
             
             # Run the AUR update
-            timeout = self.config['timeout_minutes'] * 60
+            timeout = self.config.timeout_minutes * 60
             code, stdout, stderr = CommandRunner.run_command(
                 cmd, timeout=timeout, check_return_code=False
             )
@@ -413,7 +817,7 @@ class ArchUpdater:
             }
             
         except subprocess.CalledProcessError as e:
-            self.logger.error(f"AUR package update failed: {e}")
+            self.logger.error("AUR package update failed: %s", e)
             return {
                 'status': 'failed',
                 'error': str(e),
@@ -431,24 +835,36 @@ class ArchUpdater:
         results = {}
         
         try:
-            # Remove orphaned packages
-            if self.config['clean_orphans']:
+            # Orphan removal and cache cleaning share one sudo/shell session so
+            # pacman and sudo are only started once
+            script = []
+            
+            if self.config.clean_orphans:
                 self.logger.info("Removing orphaned packages")
+                script.extend([
+                    'orphans=$(pacman -Qdtq)',
+                    f'printf "%s\\n" "$orphans"; echo {CLEANUP_DELIMITER}',
+                    'if [ -n "$orphans" ]; then pacman -Rns --noconfirm $orphans || exit $?; fi'
+                ])
+            
+            if self.config.clean_cache:
+                self.logger.info("Cleaning package cache")
+                # Remove all cached packages except the most recent versions
+                script.append('pacman -Sc --noconfirm')
+            
+            if not script:
+                return results
+            
+            code, stdout, stderr = CommandRunner.run_command(
+                ['sudo', 'sh', '-c', '\n'.join(script)],
+                timeout=600
+            )
+            
+            if self.config.clean_orphans:
+                orphan_output, _, stdout = stdout.partition(f"{CLEANUP_DELIMITER}\n")
+                orphaned_packages = [line for line in orphan_output.splitlines() if line.strip()]
                 
-                # First, find orphaned packages
-                code, stdout, stderr = CommandRunner.run_command(
-                    ['pacman', '-Qdtq'],
-                    check_return_code=False
-                )
-                
-                if code == 0 and stdout.strip():
-                    # Remove orphaned packages
-                    orphaned_packages = stdout.strip().split('\n')
-                    code, stdout, stderr = CommandRunner.run_command(
-                        ['sudo', 'pacman', '-Rns', '--noconfirm'] + orphaned_packages,
-                        timeout=300
-                    )
-                    
+                if orphaned_packages:
                     results['orphan_removal'] = {
                         'status': 'success',
                         'packages_removed': len(orphaned_packages),
@@ -461,16 +877,7 @@ class ArchUpdater:
                         'note': 'No orphaned packages found'
                     }
             
-            # Clean package cache
-            if self.config['clean_cache']:
-                self.logger.info("Cleaning package cache")
-                
-                # Remove all cached packages except the most recent versions
-                code, stdout, stderr = CommandRunner.run_command(
-                    ['sudo', 'pacman', '-Sc', '--noconfirm'],
-                    timeout=300
-                )
-                
+            if self.config.clean_cache:
                 results['cache_cleanup'] = {
                     'status': 'success',
                     'return_code': code,
@@ -480,7 +887,7 @@ class ArchUpdater:
             return results
             
         except subprocess.CalledProcessError as e:
-            self.logger.error(f"Cleanup failed: {e}")
+            self.logger.error("Cleanup failed: %s", e)
             results['error'] = str(e)
             return results
     
@@ -499,35 +906,64 @@ class ArchUpdater:
         
         # Get package counts
         try:
-            # Count official packages
-            code, stdout, stderr = CommandRunner.run_command(
-                ['pacman', '-Q'],
-                check_return_code=False
-            )
-            if code == 0:
-                info['total_packages'] = len(stdout.strip().split('\n'))
-            
-            # Count explicitly installed packages
-            code, stdout, stderr = CommandRunner.run_command(
-                ['pacman', '-Qe'],
-                check_return_code=False
-            )
-            if code == 0:
-                info['explicit_packages'] = len(stdout.strip().split('\n'))
-            
-            # Count AUR packages if helper available
-            if self.aur_helper:
-                code, stdout, stderr = CommandRunner.run_command(
-                    ['pacman', '-Qm'],
-                    check_return_code=False
-                )
-                if code == 0:
-                    info['aur_packages'] = len(stdout.strip().split('\n')) if stdout.strip() else 0
-        
+            info.update(self._get_package_counts())
         except Exception as e:
-            self.logger.warning(f"Could not get package counts: {e}")
+            self.logger.warning("Could not get package counts: %s", e)
         
         return info
+    
+    def _get_package_counts(self) -> Dict[str, int]:
+        """
+        Count installed, explicitly installed and AUR packages.
+        
+        Total and explicit counts come from a single pass over `pacman -Qi`,
+        run under the C locale so the field labels are untranslated; the
+        result is memoized for the lifetime of the updater.
+        
+        Returns:
+            Dictionary with package counts
+        """
+        if self._package_counts is not None:
+            return dict(self._package_counts)
+        
+        total = 0
+        explicit = 0
+        for line in CommandRunner.stream_lines(['pacman', '-Qi'], env=PACMAN_ENV):
+            field, _, value = line.partition(':')
+            field = field.strip()
+            if field == 'Name':
+                total += 1
+            elif field == 'Install Reason' and value.strip() == 'Explicitly installed':
+                explicit += 1
+        
+        counts = {
+            'total_packages': total,
+            'explicit_packages': explicit
+        }
+        
+        # Count AUR (foreign) packages if helper available; -Qi has no repository field
+        if self.aur_helper:
+            counts['aur_packages'] = sum(
+                1 for line in CommandRunner.stream_lines(['pacman', '-Qm']) if line.strip()
+            )
+        
+        self._package_counts = counts
+        return dict(counts)
+
+
+def results_to_json(results: Dict[str, any]) -> bytes:
+    """
+    Serialize update results to JSON, using orjson when it is installed.
+    
+    Args:
+        results: Results dictionary from run_update_cycle()
+        
+    Returns:
+        UTF-8 encoded JSON document
+    """
+    if HAS_ORJSON:
+        return orjson.dumps(results, default=str)
+    return json.dumps(results, default=str).encode('utf-8')
 
 
 def main():
@@ -542,21 +978,26 @@ def main():
                        help='Enable verbose logging')
     parser.add_argument('--aur', action='store_true',
                        help='Include AUR package updates')
+    parser.add_argument('--json', action='store_true',
+                       help='Write full results as JSON to stdout')
     
     args = parser.parse_args()
     
-    # Setup logging
+    # Setup logging (keep stdout clean for JSON output)
     log_level = 'DEBUG' if args.verbose else 'INFO'
-    logger = LogManager.setup_logging(log_level)
+    logger = LogManager.setup_logging(log_level, console_output=not args.json)
     
     # Load configuration
     config = {}
-    if args.config and os.path.exists(args.config):
+    if args.config:
         try:
-            with open(args.config, 'r') as f:
-                config = json.load(f)
+            with open(args.config, 'rb') as f:
+                data = f.read()
+            config = orjson.loads(data) if HAS_ORJSON else json.loads(data)
+        except FileNotFoundError:
+            pass
         except Exception as e:
-            logger.error(f"Failed to load config file: {e}")
+            logger.error("Failed to load config file: %s", e)
             sys.exit(1)
     
     # Command line overrides
@@ -576,6 +1017,10 @@ def main():
         updater = ArchUpdater(config, logger)
         results = updater.run_update_cycle()
         
+        if args.json:
+            sys.stdout.buffer.write(results_to_json(results) + b'\n')
+            sys.exit(0 if results['overall_status'] in ['success', 'no_updates'] else 1)
+        
         # Print summary
         print(f"\n=== Arch Linux Update Results ===")
         print(f"Status: {results['overall_status'].upper()}")
@@ -596,7 +1041,7 @@ def main():
         sys.exit(0 if results['overall_status'] in ['success', 'no_updates'] else 1)
         
     except Exception as e:
-        logger.error(f"Update process failed: {e}")
+        logger.error("Update process failed: %s", e)
         sys.exit(1)
 
 
@@ -8,95 +8,382 @@ Author: Loyd Johnson
 Date: November 2025
 """
 
+import atexit
+import errno
 import os
+import re
+import selectors
 import socket
-import subprocess
-import shutil
-import psutil
+import struct
+import threading
 import time
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from functools import cached_property, partial
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 import logging
 
 # Import from our utils module
 import sys
-sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+if not __package__:
+    # Run as a script; importers of scripts.common already have the repo root on the path
+    sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 from utils.system_utils import OSDetector, CommandRunner, LogManager
 
+# Default health check configuration (read-only; callers override per run)
+DEFAULT_CONFIG = MappingProxyType({
+    'disk_warning_threshold': 80,
+    'disk_critical_threshold': 90,
+    'memory_warning_threshold': 80,
+    'ssh_timeout': 5,
+    'network_cache_ttl': 30,
+    'check_timeout': 60,
+    'check_services': (),
+    'check_ports': (),
+    'remote_hosts': ()
+})
+
+# Worker threads used to run health checks concurrently
+CHECK_WORKERS = 8
+
+# Worker threads for blocking leaf lookups (DNS) made from inside a check.
+# Kept apart from the check pool so a check never waits on work queued
+# behind itself.
+LOOKUP_WORKERS = 32
+
+CHECK_POOL = 'health-check'
+LOOKUP_POOL = 'health-lookup'
+
+# Pseudo filesystems ignored by the disk space check on Linux
+SKIP_FSTYPES = frozenset({'tmpfs', 'devtmpfs', 'sysfs', 'proc', 'squashfs',
+                          'autofs', 'cgroup', 'cgroup2'})
+
+BYTE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB', 'PB')
+
+# Overall status ranking; STATUS_NAMES is indexed by priority
+STATUS_NAMES = ('ok', 'warning', 'error', 'critical')
+STATUS_PRIORITIES = {name: priority for priority, name in enumerate(STATUS_NAMES)}
+CRITICAL_PRIORITY = len(STATUS_NAMES) - 1
+
+# Top-level result keys that do not contribute to the overall status
+STATUS_SKIP_KEYS = frozenset({'timestamp', 'system_info', 'overall_status'})
+
+# How long the mounted partition list is reused between disk checks
+PARTITIONS_TTL_SECONDS = 30
+
+# Fields pulled from /proc/meminfo (values are in kB)
+MEMINFO_PATTERN = re.compile(
+    rb'^(MemTotal|MemFree|MemAvailable|SwapTotal|SwapFree):\s+(\d+)', re.M)
+MEMINFO_FIELDS = frozenset({b'MemTotal', b'MemFree', b'MemAvailable',
+                            b'SwapTotal', b'SwapFree'})
+
+# Environment variable supplying the default whole-run result TTL
+RESULT_TTL_ENV_VAR = 'HEALTHCHECK_TTL'
+
+# connect_ex() results meaning a non-blocking connect is still under way
+CONNECT_IN_PROGRESS = frozenset({errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY})
+
+# SO_LINGER {on, 0s}: close probe sockets with RST so none linger in TIME_WAIT
+LINGER_RESET = struct.pack('ii', 1, 0)
+
+# TCP_LISTEN as written in /proc/net/tcp
+TCP_LISTEN_STATE = b'0A'
+
+# Read size for /proc pseudo-files, which report a size of zero
+PROC_READ_SIZE = 1 << 16
+
+# Thread pools shared by every HealthChecker in the process, created on first use
+_POOL_SIZES = {CHECK_POOL: CHECK_WORKERS, LOOKUP_POOL: LOOKUP_WORKERS}
+_executors: Dict[str, ThreadPoolExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def _get_executor(name: str) -> ThreadPoolExecutor:
+    """
+    Get a shared thread pool, starting it on first use.
+    
+    Args:
+        name: CHECK_POOL or LOOKUP_POOL
+        
+    Returns:
+        ThreadPoolExecutor instance
+    """
+    executor = _executors.get(name)
+    if executor is None:
+        with _executors_lock:
+            executor = _executors.get(name)
+            if executor is None:
+                executor = ThreadPoolExecutor(max_workers=_POOL_SIZES[name],
+                                              thread_name_prefix=name)
+                _executors[name] = executor
+    return executor
+
+
+def _retire_executor(name: str, executor: ThreadPoolExecutor):
+    """
+    Stop handing out a shared pool whose workers may be stuck.
+    
+    Running threads cannot be interrupted, so the pool is only detached and
+    shut down without waiting; the next _get_executor() call starts a fresh
+    one instead of queueing behind the stuck workers.
+    
+    Args:
+        name: CHECK_POOL or LOOKUP_POOL
+        executor: Pool that was in use when the work got stuck
+    """
+    with _executors_lock:
+        if _executors.get(name) is executor:
+            del _executors[name]
+    executor.shutdown(wait=False)
+
+
+@atexit.register
+def _shutdown_executors():
+    """Stop the shared pools without waiting for idle workers."""
+    for executor in _executors.values():
+        executor.shutdown(wait=False)
+
 
 class HealthChecker:
     """Main class for performing various system health checks."""
     
-    def __init__(self, logger: Optional[logging.Logger] = None):
+    def __init__(self, logger: Optional[logging.Logger] = None, ttl_seconds: float = 0,
+                 result_ttl_seconds: Optional[float] = None):
         """
         Initialize health checker.
         
         Args:
             logger: Optional logger instance
+            ttl_seconds: How long check results may be reused (0 disables caching)
+            result_ttl_seconds: How long a complete run_all_checks() result may be
+                returned again as-is (defaults to $HEALTHCHECK_TTL, else 0)
         """
         self.logger = logger or LogManager.setup_logging()
         self.os_info = OSDetector.get_os_info()
+        self._is_linux = self.os_info['os_type'] == 'linux'
+        self._is_windows = self.os_info['os_type'] == 'windows'
+        self._is_macos = self.os_info['distro'] == 'macos'
+        self._is_systemd = os.path.exists('/run/systemd/system')
+        self.ttl_seconds = ttl_seconds
+        self._cache: Dict[str, Tuple[float, Dict]] = {}
+        self._cache_config: Optional[Dict] = None
+        if result_ttl_seconds is None:
+            result_ttl_seconds = float(os.environ.get(RESULT_TTL_ENV_VAR, 0))
+        self.result_ttl_seconds = result_ttl_seconds
+        self._last_result: Optional[Tuple[float, Dict]] = None
+        self._partitions: Optional[Tuple[float, List]] = None
+        self._net_cache: Dict[str, Tuple[float, Dict]] = {}
+    
+    # psutil is imported on first use so that callers needing only the
+    # network or port checks never load it. These values are invariant
+    # for the life of the process.
+    
+    @cached_property
+    def _boot_time(self) -> float:
+        import psutil
+        return psutil.boot_time()
+    
+    @cached_property
+    def _boot_time_int(self) -> int:
+        return int(self._boot_time)
     
-    def run_all_checks(self, config: Optional[Dict] = None) -> Dict[str, Dict]:
+    @cached_property
+    def _boot_time_iso(self) -> str:
+        return datetime.fromtimestamp(self._boot_time).isoformat()
+    
+    @cached_property
+    def _cpu_count(self) -> Optional[int]:
+        import psutil
+        return psutil.cpu_count(logical=True)
+    
+    @cached_property
+    def _cpu_count_physical(self) -> Optional[int]:
+        import psutil
+        return psutil.cpu_count(logical=False)
+    
+    def invalidate_cache(self, check_names: Optional[Iterable[str]] = None):
+        """
+        Drop cached check results so the next run re-executes them.
+        
+        Args:
+            check_names: Result keys to invalidate (all when None)
+        """
+        self._last_result = None
+        if check_names is None:
+            self._cache.clear()
+            self._net_cache.clear()
+        else:
+            for name in check_names:
+                self._cache.pop(name, None)
+                if name == 'network':
+                    self._net_cache.clear()
+    
+    def _run_check(self, name: str, check: Callable[[], Dict]) -> Dict:
+        """
+        Run a single check, reusing a cached result within the TTL.
+        
+        Args:
+            name: Result key of the check
+            check: Zero-argument check callable
+            
+        Returns:
+            Check result dictionary
+        """
+        if self.ttl_seconds > 0:
+            cached = self._cache.get(name)
+            if cached is not None and time.monotonic() - cached[0] < self.ttl_seconds:
+                self.logger.debug(f"Using cached result for health check: {name}")
+                return cached[1]
+        
+        result = check()
+        
+        if self.ttl_seconds > 0:
+            self._cache[name] = (time.monotonic(), result)
+        return result
+    
+    def run_all_checks(self, config: Optional[Dict] = None,
+                       force: bool = False) -> Dict[str, Dict]:
         """
         Run all available health checks.
         
+        The checks are I/O-bound (filesystem, subprocess and socket calls), so
+        they run concurrently on a shared thread pool and the wall time is
+        bounded by the slowest check. Checks still running after
+        `check_timeout` seconds are reported as errors.
+        
         Args:
             config: Optional configuration dictionary
+            force: Ignore cached results, e.g. after the system has changed
             
         Returns:
             Dictionary with results from all checks
         """
+        config = self._resolve_config(config)
+        
+        if force:
+            self.invalidate_cache()
+        
+        # Serve polling bursts from the last complete run
+        if self.result_ttl_seconds > 0 and self._last_result is not None:
+            timestamp, last_results = self._last_result
+            if time.monotonic() - timestamp < self.result_ttl_seconds:
+                self.logger.debug("Using cached health check results")
+                return last_results
+        
         self.logger.info("Starting comprehensive health check")
         
-        # Default configuration
-        default_config = {
-            'disk_warning_threshold': 80,
-            'disk_critical_threshold': 90,
-            'memory_warning_threshold': 80,
-            'ssh_timeout': 5,
-            'check_services': [],
-            'check_ports': [],
-            'remote_hosts': []
-        }
+        checks = self._get_checks(config)
         
-        if config:
-            default_config.update(config)
-        config = default_config
+        results = {'timestamp': datetime.now().isoformat()}
         
-        results = {
-            'timestamp': datetime.now().isoformat(),
-            'system_info': self.get_system_info(),
-            'disk_space': self.check_disk_space(
-                warning_threshold=config['disk_warning_threshold'],
-                critical_threshold=config['disk_critical_threshold']
-            ),
-            'memory_usage': self.check_memory_usage(
-                warning_threshold=config['memory_warning_threshold']
-            ),
-            'uptime': self.check_uptime(),
-            'load_average': self.check_load_average(),
-            'services': self.check_services(config['check_services']),
-            'ports': self.check_ports(config['check_ports']),
-            'network': self.check_network_connectivity(config['remote_hosts'])
-        }
+        # System info is cheap; gather it inline while the other checks run
+        system_info = checks.pop('system_info')
+        executor = _get_executor(CHECK_POOL)
+        futures = {executor.submit(self._run_check, name, check): name
+                   for name, check in checks.items()}
+        results['system_info'] = self._run_check('system_info', system_info)
+        
+        check_results = {}
+        try:
+            for future in as_completed(futures, timeout=config['check_timeout']):
+                name = futures[future]
+                try:
+                    check_results[name] = future.result()
+                except Exception as e:
+                    self.logger.error(f"Health check {name} failed: {e}")
+                    check_results[name] = {'error': str(e), 'status': 'error'}
+        except FuturesTimeoutError:
+            for future, name in futures.items():
+                if name not in check_results:
+                    future.cancel()
+                    self.logger.error(f"Health check {name} timed out")
+                    check_results[name] = {'error': 'Timed out', 'status': 'error'}
+            # A hung check keeps its worker; later runs get a fresh pool
+            _retire_executor(CHECK_POOL, executor)
+        
+        # Keep the same key order regardless of completion order
+        for name in checks:
+            results[name] = check_results[name]
         
         # Calculate overall health status
         results['overall_status'] = self._calculate_overall_status(results)
         
         self.logger.info(f"Health check completed. Overall status: {results['overall_status']}")
+        
+        if self.result_ttl_seconds > 0:
+            self._last_result = (time.monotonic(), results)
         return results
     
-    def get_system_info(self) -> Dict[str, str]:
+    def _resolve_config(self, config: Optional[Dict] = None) -> Dict:
+        """
+        Merge a health check configuration with the defaults.
+        
+        Args:
+            config: Optional configuration dictionary
+            
+        Returns:
+            Complete configuration dictionary
+        """
+        resolved = {**DEFAULT_CONFIG, **config} if config else dict(DEFAULT_CONFIG)
+        
+        # Cached results are only valid for the configuration that produced them
+        if resolved != self._cache_config:
+            self._cache.clear()
+            self._last_result = None
+            self._cache_config = resolved
+        
+        return resolved
+    
+    def _get_checks(self, config: Dict) -> Dict[str, Callable[[], Dict]]:
+        """
+        Build the ordered set of health checks for a configuration.
+        
+        Args:
+            config: Complete configuration from _resolve_config()
+            
+        Returns:
+            Dictionary mapping result keys to zero-argument check callables
+        """
+        # system_info and uptime report the same figures; derive them once
+        try:
+            uptime = self._compute_uptime()
+        except Exception as e:
+            self.logger.error(f"Failed to compute uptime: {e}")
+            uptime = None
+        
+        return {
+            'system_info': partial(self.get_system_info, uptime),
+            'disk_space': partial(
+                self.check_disk_space,
+                warning_threshold=config['disk_warning_threshold'],
+                critical_threshold=config['disk_critical_threshold']
+            ),
+            'memory_usage': partial(
+                self.check_memory_usage,
+                warning_threshold=config['memory_warning_threshold']
+            ),
+            'uptime': partial(self.check_uptime, uptime),
+            'load_average': self.check_load_average,
+            'services': partial(self.check_services, config['check_services']),
+            'ports': partial(self.check_ports, config['check_ports']),
+            'network': partial(self.check_network_connectivity, config['remote_hosts'],
+                               cache_ttl=config['network_cache_ttl'])
+        }
+    
+    def get_system_info(self, uptime: Optional[Tuple[str, int, str]] = None) -> Dict[str, str]:
         """
         Get basic system information.
         
+        Args:
+            uptime: Optional precomputed result of _compute_uptime()
+            
         Returns:
             Dictionary with system details
         """
         try:
-            boot_time = datetime.fromtimestamp(psutil.boot_time())
-            uptime = datetime.now() - boot_time
+            boot_time, uptime_seconds, uptime_human = uptime or self._compute_uptime()
             
             info = {
                 'os_type': self.os_info['os_type'],
@@ -104,14 +391,14 @@ class HealthChecker:
                 'version': self.os_info['version'],
                 'architecture': self.os_info['architecture'],
                 'hostname': socket.gethostname(),
-                'boot_time': boot_time.isoformat(),
-                'uptime_seconds': int(uptime.total_seconds()),
-                'uptime_human': str(uptime).split('.')[0]  # Remove microseconds
+                'boot_time': boot_time,
+                'uptime_seconds': uptime_seconds,
+                'uptime_human': uptime_human
             }
             
             # Add CPU information
-            info['cpu_count'] = psutil.cpu_count(logical=True)
-            info['cpu_count_physical'] = psutil.cpu_count(logical=False)
+            info['cpu_count'] = self._cpu_count
+            info['cpu_count_physical'] = self._cpu_count_physical
             
             return info
             
@@ -135,17 +422,27 @@ class HealthChecker:
         
         try:
             # Get all disk partitions
-            partitions = psutil.disk_partitions()
+            partitions = self._get_disk_partitions()
+            seen = set()
+            format_bytes = self._format_bytes
+            skip_fstypes = SKIP_FSTYPES if self._is_linux else frozenset()
+            from psutil import disk_usage
             
             for partition in partitions:
+                mountpoint = partition.mountpoint
+                
+                # Skip special filesystems on Linux
+                if partition.fstype in skip_fstypes:
+                    continue
+                
+                # Stacked mounts repeat a device/mountpoint pair; stat it once
+                key = (partition.device, mountpoint)
+                if key in seen:
+                    continue
+                seen.add(key)
+                
                 try:
-                    # Skip special filesystems on Linux
-                    if self.os_info['os_type'] == 'linux':
-                        skip_types = ['tmpfs', 'devtmpfs', 'sysfs', 'proc', 'squashfs']
-                        if partition.fstype in skip_types:
-                            continue
-                    
-                    usage = psutil.disk_usage(partition.mountpoint)
+                    usage = disk_usage(mountpoint)
                     used_percent = (usage.used / usage.total) * 100
                     
                     # Determine status
@@ -156,7 +453,7 @@ class HealthChecker:
                     else:
                         status = 'ok'
                     
-                    results[partition.mountpoint] = {
+                    results[mountpoint] = {
                         'device': partition.device,
                         'fstype': partition.fstype,
                         'total_bytes': usage.total,
@@ -164,18 +461,18 @@ class HealthChecker:
                         'free_bytes': usage.free,
                         'used_percent': round(used_percent, 2),
                         'status': status,
-                        'total_human': self._format_bytes(usage.total),
-                        'used_human': self._format_bytes(usage.used),
-                        'free_human': self._format_bytes(usage.free)
+                        'total_human': format_bytes(usage.total),
+                        'used_human': format_bytes(usage.used),
+                        'free_human': format_bytes(usage.free)
                     }
                     
                 except PermissionError:
-                    results[partition.mountpoint] = {
+                    results[mountpoint] = {
                         'error': 'Permission denied',
                         'status': 'unknown'
                     }
                 except Exception as e:
-                    results[partition.mountpoint] = {
+                    results[mountpoint] = {
                         'error': str(e),
                         'status': 'error'
                     }
@@ -186,7 +483,20 @@ class HealthChecker:
         
         return results
     
-    def check_memory_usage(self, warning_threshold: int = 80) -> Dict[str, any]:
+    def _get_disk_partitions(self) -> List:
+        """
+        Get mounted partitions, reusing the list for PARTITIONS_TTL_SECONDS.
+        
+        Returns:
+            List of psutil partition tuples
+        """
+        now = time.monotonic()
+        if self._partitions is None or now - self._partitions[0] >= PARTITIONS_TTL_SECONDS:
+            import psutil
+            self._partitions = (now, psutil.disk_partitions())
+        return self._partitions[1]
+    
+    def check_memory_usage(self, warning_threshold: int = 80) -> Dict[str, Any]:
         """
         Check system memory usage.
         
@@ -197,32 +507,31 @@ class HealthChecker:
             Dictionary with memory usage information
         """
         try:
-            memory = psutil.virtual_memory()
-            swap = psutil.swap_memory()
+            memory, swap = self._read_memory()
             
             # Determine status
-            if memory.percent >= warning_threshold:
+            if memory['percent'] >= warning_threshold:
                 status = 'warning'
             else:
                 status = 'ok'
             
             return {
-                'total_bytes': memory.total,
-                'available_bytes': memory.available,
-                'used_bytes': memory.used,
-                'free_bytes': memory.free,
-                'used_percent': round(memory.percent, 2),
+                'total_bytes': memory['total'],
+                'available_bytes': memory['available'],
+                'used_bytes': memory['used'],
+                'free_bytes': memory['free'],
+                'used_percent': round(memory['percent'], 2),
                 'status': status,
-                'total_human': self._format_bytes(memory.total),
-                'available_human': self._format_bytes(memory.available),
-                'used_human': self._format_bytes(memory.used),
+                'total_human': self._format_bytes(memory['total']),
+                'available_human': self._format_bytes(memory['available']),
+                'used_human': self._format_bytes(memory['used']),
                 'swap': {
-                    'total_bytes': swap.total,
-                    'used_bytes': swap.used,
-                    'free_bytes': swap.free,
-                    'used_percent': round(swap.percent, 2),
-                    'total_human': self._format_bytes(swap.total),
-                    'used_human': self._format_bytes(swap.used)
+                    'total_bytes': swap['total'],
+                    'used_bytes': swap['used'],
+                    'free_bytes': swap['free'],
+                    'used_percent': round(swap['percent'], 2),
+                    'total_human': self._format_bytes(swap['total']),
+                    'used_human': self._format_bytes(swap['used'])
                 }
             }
             
@@ -230,27 +539,66 @@ class HealthChecker:
             self.logger.error(f"Failed to check memory usage: {e}")
             return {'error': str(e), 'status': 'error'}
     
-    def check_uptime(self) -> Dict[str, any]:
+    def _read_memory(self) -> Tuple[Dict[str, float], Dict[str, float]]:
+        """
+        Read memory and swap figures.
+        
+        On Linux only the needed fields are parsed out of /proc/meminfo;
+        elsewhere (or on kernels without MemAvailable) psutil is used.
+        
+        Returns:
+            Tuple of (memory, swap) dicts with total/available/used/free/percent
+        """
+        if self._is_linux:
+            fields = dict(MEMINFO_PATTERN.findall(self._read_proc_file('/proc/meminfo')))
+            if fields.keys() >= MEMINFO_FIELDS:
+                total = int(fields[b'MemTotal']) * 1024
+                available = int(fields[b'MemAvailable']) * 1024
+                swap_total = int(fields[b'SwapTotal']) * 1024
+                swap_free = int(fields[b'SwapFree']) * 1024
+                used = total - available
+                swap_used = swap_total - swap_free
+                memory = {
+                    'total': total,
+                    'available': available,
+                    'used': used,
+                    'free': int(fields[b'MemFree']) * 1024,
+                    'percent': round(used / total * 100, 1) if total else 0.0
+                }
+                swap = {
+                    'total': swap_total,
+                    'used': swap_used,
+                    'free': swap_free,
+                    'percent': round(swap_used / swap_total * 100, 1) if swap_total else 0.0
+                }
+                return memory, swap
+        
+        import psutil
+        vm = psutil.virtual_memory()
+        sw = psutil.swap_memory()
+        memory = {'total': vm.total, 'available': vm.available, 'used': vm.used,
+                  'free': vm.free, 'percent': vm.percent}
+        swap = {'total': sw.total, 'used': sw.used, 'free': sw.free,
+                'percent': sw.percent}
+        return memory, swap
+    
+    def check_uptime(self, uptime: Optional[Tuple[str, int, str]] = None) -> Dict[str, Any]:
         """
         Check system uptime.
         
+        Args:
+            uptime: Optional precomputed result of _compute_uptime()
+            
         Returns:
             Dictionary with uptime information
         """
         try:
-            boot_time = datetime.fromtimestamp(psutil.boot_time())
-            uptime = datetime.now() - boot_time
-            uptime_seconds = int(uptime.total_seconds())
-            
-            # Calculate days, hours, minutes
-            days = uptime_seconds // 86400
-            hours = (uptime_seconds % 86400) // 3600
-            minutes = (uptime_seconds % 3600) // 60
+            boot_time, uptime_seconds, uptime_human = uptime or self._compute_uptime()
             
             return {
-                'boot_time': boot_time.isoformat(),
+                'boot_time': boot_time,
                 'uptime_seconds': uptime_seconds,
-                'uptime_human': f"{days}d {hours}h {minutes}m",
+                'uptime_human': uptime_human,
                 'status': 'ok'
             }
             
@@ -258,7 +606,65 @@ class HealthChecker:
             self.logger.error(f"Failed to check uptime: {e}")
             return {'error': str(e), 'status': 'error'}
     
-    def check_load_average(self) -> Dict[str, any]:
+    def _compute_uptime(self) -> Tuple[str, int, str]:
+        """
+        Compute the boot time and current uptime.
+        
+        Returns:
+            Tuple of (boot time ISO string, uptime seconds, human-readable uptime)
+        """
+        uptime_seconds = self._get_uptime_seconds()
+        return self._boot_time_iso, uptime_seconds, self._format_uptime(uptime_seconds)
+    
+    @staticmethod
+    def _read_proc_file(path: str) -> bytes:
+        """
+        Read a /proc pseudo-file with raw os.read calls.
+        
+        Args:
+            path: Path of the file to read
+            
+        Returns:
+            File contents as bytes
+        """
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            chunks = []
+            while True:
+                chunk = os.read(fd, PROC_READ_SIZE)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+        finally:
+            os.close(fd)
+        return b''.join(chunks)
+    
+    def _get_uptime_seconds(self) -> int:
+        """
+        Get whole seconds since boot.
+        
+        Returns:
+            Uptime in seconds
+        """
+        if self._is_linux:
+            return int(float(self._read_proc_file('/proc/uptime').split(None, 1)[0]))
+        return int(time.time()) - self._boot_time_int
+    
+    @staticmethod
+    def _format_uptime(uptime_seconds: int) -> str:
+        """
+        Format an uptime as days, hours and minutes.
+        
+        Args:
+            uptime_seconds: Uptime in seconds
+            
+        Returns:
+            Formatted string such as '3d 4h 12m'
+        """
+        days, remainder = divmod(uptime_seconds, 86400)
+        return f"{days}d {remainder // 3600}h {remainder % 3600 // 60}m"
+    
+    def check_load_average(self) -> Dict[str, Any]:
         """
         Check system load average (Linux/macOS only).
         
@@ -266,8 +672,9 @@ class HealthChecker:
             Dictionary with load average information
         """
         try:
-            if self.os_info['os_type'] == 'windows':
+            if self._is_windows:
                 # Windows doesn't have load average, use CPU percent instead
+                import psutil
                 cpu_percent = psutil.cpu_percent(interval=1)
                 return {
                     'cpu_percent': cpu_percent,
@@ -276,8 +683,12 @@ class HealthChecker:
                 }
             
             # Linux/macOS load average
-            load1, load5, load15 = os.getloadavg()
-            cpu_count = psutil.cpu_count()
+            if self._is_linux:
+                load1, load5, load15 = map(
+                    float, self._read_proc_file('/proc/loadavg').split(None, 3)[:3])
+            else:
+                load1, load5, load15 = os.getloadavg()
+            cpu_count = self._cpu_count
             
             # Normalize load by CPU count
             load_normalized = load1 / cpu_count
@@ -318,27 +729,35 @@ class HealthChecker:
         if not service_list:
             return {'note': 'No services specified for checking'}
         
-        for service in service_list:
+        if self._is_systemd:
+            # systemctl prints one state per unit, so one call covers all services
             try:
-                if self.os_info['distro'] in ['debian', 'ubuntu', 'fedora', 'centos', 'rhel']:
-                    # Use systemctl for systemd-based systems
-                    code, stdout, stderr = CommandRunner.run_command(
-                        ['systemctl', 'is-active', service],
-                        check_return_code=False
-                    )
-                    
-                    status = 'running' if stdout.strip() == 'active' else 'stopped'
-                    
-                elif self.os_info['distro'] == 'arch':
-                    # Arch also uses systemctl
-                    code, stdout, stderr = CommandRunner.run_command(
-                        ['systemctl', 'is-active', service],
-                        check_return_code=False
-                    )
-                    
-                    status = 'running' if stdout.strip() == 'active' else 'stopped'
+                code, stdout, stderr = CommandRunner.run_command(
+                    ['systemctl', 'is-active'] + list(service_list),
+                    check_return_code=False
+                )
+                states = stdout.splitlines()
+                
+                for index, service in enumerate(service_list):
+                    state = states[index].strip() if index < len(states) else ''
+                    status = 'running' if state == 'active' else 'stopped'
+                    results[service] = {
+                        'status': status,
+                        'health_status': 'ok' if status == 'running' else 'warning'
+                    }
                     
-                elif self.os_info['distro'] == 'macos':
+            except Exception as e:
+                for service in service_list:
+                    results[service] = {
+                        'error': str(e),
+                        'health_status': 'error'
+                    }
+            
+            return results
+        
+        for service in service_list:
+            try:
+                if self._is_macos:
                     # Use launchctl for macOS
                     code, stdout, stderr = CommandRunner.run_command(
                         ['launchctl', 'print', f"system/{service}"],
@@ -380,9 +799,7 @@ class HealthChecker:
         
         # Get all listening connections
         try:
-            connections = psutil.net_connections(kind='inet')
-            listening_ports = {conn.laddr.port for conn in connections 
-                             if conn.status == psutil.CONN_LISTEN}
+            listening_ports = self._get_listening_ports()
         except Exception as e:
             self.logger.error(f"Failed to get network connections: {e}")
             listening_ports = set()
@@ -404,69 +821,184 @@ class HealthChecker:
         
         return results
     
-    def check_network_connectivity(self, hosts: List[str], timeout: int = 5) -> Dict[str, Dict]:
+    def _get_listening_ports(self) -> set:
+        """
+        Collect the TCP ports in LISTEN state.
+        
+        On Linux this reads /proc/net/tcp{,6} directly instead of letting
+        psutil walk every process's file descriptors.
+        
+        Returns:
+            Set of listening port numbers
+        """
+        if not self._is_linux:
+            import psutil
+            connections = psutil.net_connections(kind='inet')
+            return {conn.laddr.port for conn in connections
+                    if conn.status == psutil.CONN_LISTEN}
+        
+        listening_ports = set()
+        for path in ('/proc/net/tcp', '/proc/net/tcp6'):
+            try:
+                lines = self._read_proc_file(path).splitlines()
+            except FileNotFoundError:
+                continue
+            
+            for line in lines[1:]:  # Skip header
+                fields = line.split()
+                # fields[1] is local "ADDR:PORT" in hex, fields[3] the state
+                if len(fields) > 3 and fields[3] == TCP_LISTEN_STATE:
+                    listening_ports.add(int(fields[1].rpartition(b':')[2], 16))
+        
+        return listening_ports
+    
+    def check_network_connectivity(self, hosts: List[str], timeout: int = 5,
+                                   cache_ttl: float = 0) -> Dict[str, Dict]:
         """
         Check network connectivity to remote hosts.
         
+        Hosts are probed concurrently, so the check takes as long as the
+        slowest single connection attempt.
+        
         Args:
             hosts: List of hostnames or IP addresses to check
             timeout: Connection timeout in seconds
+            cache_ttl: Seconds a host's connection result may be reused (0 disables)
             
         Returns:
             Dictionary with connectivity results
         """
-        results = {}
-        
         if not hosts:
             return {'note': 'No hosts specified for checking'}
         
+        results = {}
+        if cache_ttl > 0:
+            now = time.monotonic()
+            for host in hosts:
+                cached = self._net_cache.get(host)
+                if cached is not None and now - cached[0] < cache_ttl:
+                    results[host] = cached[1]
+        
+        to_probe = [host for host in hosts if host not in results]
+        if to_probe:
+            probed = self._probe_hosts(to_probe, timeout)
+            if cache_ttl > 0:
+                now = time.monotonic()
+                for host, result in probed.items():
+                    # Only connect outcomes are cached; resolution errors are retried
+                    if 'reachable' in result:
+                        self._net_cache[host] = (now, result)
+            results.update(probed)
+        
+        return {host: results[host] for host in hosts}
+    
+    def _probe_hosts(self, hosts: List[str], timeout: int) -> Dict[str, Dict]:
+        """
+        Attempt a TCP connection to every host in one non-blocking wave.
+        
+        Names are resolved first (getaddrinfo blocks, so that happens on the
+        lookup pool; this check itself runs on the check pool), then
+        all connects are started at once and completions are drained from a
+        single selector on this thread.
+        
+        Args:
+            hosts: Hostnames or IP addresses, optionally with ':port' (default 22)
+            timeout: Connection timeout in seconds
+            
+        Returns:
+            Dictionary mapping each host to its connectivity result
+        """
+        results = {}
+        targets = {}
         for host in hosts:
+            hostname, _, port_str = host.partition(':')
             try:
-                # Parse host and port
-                if ':' in host:
-                    hostname, port_str = host.split(':', 1)
-                    port = int(port_str)
-                else:
-                    hostname = host
-                    port = 22  # Default to SSH port
-                
-                # Test connection
-                start_time = time.time()
-                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                sock.settimeout(timeout)
+                targets[host] = (hostname, int(port_str) if port_str else 22)
+            except ValueError as e:
+                results[host] = {'error': str(e), 'status': 'error'}
+        
+        resolved = dict(zip(targets, _get_executor(LOOKUP_POOL).map(
+            self._resolve_target, targets.values())))
+        
+        selector = selectors.DefaultSelector()
+        pending = {}
+        try:
+            for host, address in resolved.items():
+                if isinstance(address, dict):
+                    results[host] = address
+                    continue
                 
-                try:
-                    result = sock.connect_ex((hostname, port))
-                    response_time = (time.time() - start_time) * 1000  # Convert to ms
-                    
-                    if result == 0:
-                        status = 'ok'
-                        reachable = True
-                    else:
-                        status = 'warning'
-                        reachable = False
-                        
-                finally:
+                # Tracked from creation on so the finally block closes it
+                sock = pending[host] = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, LINGER_RESET)
+                sock.setblocking(False)
+                start_time = time.monotonic()
+                error = sock.connect_ex(address)
+                if error in CONNECT_IN_PROGRESS:
+                    selector.register(sock, selectors.EVENT_WRITE, (host, start_time))
+                else:
+                    del pending[host]
                     sock.close()
-                
-                results[host] = {
-                    'reachable': reachable,
-                    'response_time_ms': round(response_time, 2),
-                    'status': status
-                }
-                
-            except socket.gaierror:
-                results[host] = {
-                    'error': 'DNS resolution failed',
-                    'status': 'error'
-                }
-            except Exception as e:
-                results[host] = {
-                    'error': str(e),
-                    'status': 'error'
-                }
+                    results[host] = self._connect_result(error == 0, start_time)
+            
+            deadline = time.monotonic() + timeout
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                for key, _ in selector.select(remaining):
+                    host, start_time = key.data
+                    sock = key.fileobj
+                    error = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                    results[host] = self._connect_result(error == 0, start_time)
+                    selector.unregister(sock)
+                    sock.close()
+                    del pending[host]
+            
+            # Anything still connecting has timed out
+            for host, sock in pending.items():
+                results[host] = self._connect_result(False, selector.get_key(sock).data[1])
+        finally:
+            selector.close()
+            for sock in pending.values():
+                sock.close()
         
-        return results
+        return {host: results[host] for host in hosts}
+    
+    @staticmethod
+    def _resolve_target(target: Tuple[str, int]):
+        """
+        Resolve a (hostname, port) pair to an IPv4 socket address.
+        
+        Args:
+            target: Tuple of hostname and port
+            
+        Returns:
+            Socket address tuple, or an error result dictionary
+        """
+        try:
+            return socket.getaddrinfo(target[0], target[1], socket.AF_INET,
+                                      socket.SOCK_STREAM)[0][4]
+        except socket.gaierror:
+            return {
+                'error': 'DNS resolution failed',
+                'status': 'error'
+            }
+        except Exception as e:
+            return {
+                'error': str(e),
+                'status': 'error'
+            }
+    
+    @staticmethod
+    def _connect_result(reachable: bool, start_time: float) -> Dict[str, Any]:
+        """Build the connectivity result for a finished connection attempt."""
+        response_time = (time.monotonic() - start_time) * 1000  # Convert to ms
+        return {
+            'reachable': reachable,
+            'response_time_ms': round(response_time, 2),
+            'status': 'ok' if reachable else 'warning'
+        }
     
     def _calculate_overall_status(self, results: Dict) -> str:
         """
@@ -478,37 +1010,32 @@ class HealthChecker:
         Returns:
             Overall status string
         """
-        status_priorities = {'critical': 3, 'error': 2, 'warning': 1, 'ok': 0}
+        get_priority = STATUS_PRIORITIES.get
         max_priority = 0
+        stack = [value for key, value in results.items()
+                 if key not in STATUS_SKIP_KEYS and isinstance(value, (dict, list))]
         
-        def check_status(item):
-            nonlocal max_priority
+        # Walk nested results iteratively; a dict carrying its own status
+        # is not descended into
+        while stack:
+            item = stack.pop()
             if isinstance(item, dict):
-                if 'status' in item:
-                    priority = status_priorities.get(item['status'], 0)
-                    max_priority = max(max_priority, priority)
+                status = item.get('status')
+                if status is not None:
+                    priority = get_priority(status, 0)
+                    if priority > max_priority:
+                        max_priority = priority
+                        if max_priority == CRITICAL_PRIORITY:
+                            break
                 else:
-                    # Recursively check nested dictionaries
-                    for value in item.values():
-                        if isinstance(value, (dict, list)):
-                            check_status(value)
-            elif isinstance(item, list):
-                for element in item:
-                    check_status(element)
-        
-        # Check all results except timestamp and system_info
-        for key, value in results.items():
-            if key not in ['timestamp', 'system_info', 'overall_status']:
-                check_status(value)
-        
-        # Return status based on highest priority found
-        for status, priority in status_priorities.items():
-            if priority == max_priority:
-                return status
+                    stack.extend(v for v in item.values() if isinstance(v, (dict, list)))
+            else:
+                stack.extend(item)
         
-        return 'ok'
+        return STATUS_NAMES[max_priority]
     
-    def _format_bytes(self, bytes_value: int) -> str:
+    @staticmethod
+    def _format_bytes(bytes_value: int) -> str:
         """
         Format bytes into human-readable format.
         
@@ -518,11 +1045,9 @@ class HealthChecker:
         Returns:
             Formatted string
         """
-        for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-            if bytes_value < 1024.0:
-                return f"{bytes_value:.1f} {unit}"
-            bytes_value /= 1024.0
-        return f"{bytes_value:.1f} PB"
+        # Each unit step is 10 bits, so the bit length picks the unit directly
+        index = min(max(int(bytes_value).bit_length() - 1, 0) // 10, len(BYTE_UNITS) - 1)
+        return f"{bytes_value / (1 << (10 * index)):.1f} {BYTE_UNITS[index]}"
 
 
 def main():
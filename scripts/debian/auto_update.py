@@ -10,16 +10,163 @@ Date: November 2025
 import os
 import sys
 import subprocess
+import shutil
 import json
-from datetime import datetime
-from typing import Dict, List, Optional
+import re
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, fields
+from typing import Dict, List, Optional, Tuple
 import logging
 
+try:
+    import apt_pkg
+    HAS_APT_PKG = True
+except ImportError:
+    HAS_APT_PKG = False
+
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+    HAS_INOTIFY = True
+except ImportError:
+    HAS_INOTIFY = False
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 # Add parent directories to path for imports
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 from utils.system_utils import OSDetector, CommandRunner, LogManager
 from scripts.common.health_checks import HealthChecker
 
+# apt rebuilds its binary cache whenever the package lists change and dpkg
+# rewrites its status file whenever installed versions change, so their
+# mtimes together identify the set of upgradable packages
+APT_PKGCACHE_PATH = '/var/cache/apt/pkgcache.bin'
+DPKG_STATUS_PATH = '/var/lib/dpkg/status'
+UPGRADABLE_CACHE_FILE = '/var/cache/system-scripts/debian_upgradable.json'
+
+# Touched after every successful apt update by the APT::Update::Post-Invoke-Success
+# hook (update-notifier-common); absent on systems without that hook
+APT_UPDATE_STAMP = '/var/lib/apt/periodic/update-success-stamp'
+
+# Created by package maintainer scripts when a reboot is needed
+REBOOT_REQUIRED_FILE = '/var/run/reboot-required'
+
+UNATTENDED_UPGRADES_CONF = '/etc/apt/apt.conf.d/50unattended-upgrades'
+UNATTENDED_UPGRADES_TEMPLATE = '''// Automatically upgrade packages from these origin patterns
+Unattended-Upgrade::Allowed-Origins {{
+{origins}
+}};
+
+// List of packages to not update (regexp are supported)
+Unattended-Upgrade::Package-Blacklist {{
+{blacklist}
+}};
+
+// Auto-remove unused dependencies
+Unattended-Upgrade::Remove-Unused-Dependencies "{auto_remove}";
+
+// Automatically reboot if required
+Unattended-Upgrade::Automatic-Reboot "{auto_reboot}";
+
+// Automatically reboot time
+Unattended-Upgrade::Automatic-Reboot-Time "{reboot_time}";
+
+// Send email on errors
+Unattended-Upgrade::Mail "{mail}";
+'''
+
+# Environment for apt, dpkg and unattended-upgrade: untranslated, stable
+# output and no prompts from debconf or apt-listchanges
+APT_ENV = {
+    'LC_ALL': 'C',
+    'LANG': 'C',
+    'DEBIAN_FRONTEND': 'noninteractive',
+    'APT_LISTCHANGES_FRONTEND': 'none'
+}
+
+# Marker echoed before each step of the combined cleanup command
+CLEANUP_STEP_MARKER = '--- system-scripts cleanup: '
+
+# Cleanup steps as (config flag, result key, command, log message)
+CLEANUP_STEPS = (
+    ('auto_remove', 'autoremove', 'apt-get autoremove -y', "Removing unused packages"),
+    ('auto_clean', 'autoclean', 'apt-get autoclean -y', "Cleaning package cache")
+)
+
+# ionice(1) scheduling classes accepted by the io_class setting
+IO_CLASSES = {'realtime': 1, 'best-effort': 2, 'idle': 3}
+
+# Configuration files and directories archived before updating
+BACKUP_CONFIG_FILES = (
+    '/etc/apt/sources.list',
+    '/etc/apt/sources.list.d/',
+    '/etc/ssh/sshd_config',
+    '/etc/fstab',
+    '/etc/crontab'
+)
+
+# Security pockets (e.g. bookworm-security, jammy-apps-security) end with this
+SECURITY_ARCHIVE_SUFFIX = '-security'
+
+# apt-get -s line: "Inst pkg [old] (new Origin:ver/archive, ... [arch])"
+INST_LINE_PATTERN = re.compile(r'^Inst (\S+) (?:\[[^\]]*\] )?\((\S+) ([^)]+)\)')
+
+
+@dataclass
+class DebianUpdateResults:
+    """Outcome of one Debian/Ubuntu update cycle."""
+    
+    timestamp: int  # time.time_ns() at cycle start; ISO 8601 in to_dict()
+    os_info: Dict
+    pre_update_health: Optional[Dict] = None
+    package_list_update: Optional[Dict] = None
+    available_updates: Optional[Dict] = None
+    update_execution: Optional[Dict] = None
+    cleanup: Optional[Dict] = None
+    post_update_health: Optional[Dict] = None
+    reboot_required: bool = False
+    overall_status: str = 'success'
+    error: Optional[str] = None
+    
+    def to_dict(self) -> Dict[str, any]:
+        """
+        Convert to the plain dictionary returned by run_update_cycle.
+        
+        Stage results are shared, not copied, the timestamp is rendered as
+        local ISO 8601 and 'error' is only present when the cycle failed.
+        
+        Returns:
+            Results dictionary
+        """
+        results = {f.name: getattr(self, f.name) for f in DEBIAN_RESULT_FIELDS}
+        results['timestamp'] = _format_timestamp_ns(self.timestamp)
+        if self.error is None:
+            del results['error']
+        return results
+
+
+DEBIAN_RESULT_FIELDS = fields(DebianUpdateResults)
+
+
+def _format_timestamp_ns(timestamp_ns: int) -> str:
+    """
+    Format a time.time_ns() value like datetime.now().isoformat().
+    
+    Args:
+        timestamp_ns: Nanoseconds since the epoch
+        
+    Returns:
+        Local time as YYYY-MM-DDTHH:MM:SS.ffffff
+    """
+    seconds, nanoseconds = divmod(timestamp_ns, 1_000_000_000)
+    return time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(seconds)) + f'.{nanoseconds // 1000:06d}'
+
 
 class DebianUpdater:
     """Handles automatic updates for Debian/Ubuntu systems."""
@@ -46,6 +193,7 @@ class DebianUpdater:
             'auto_reboot': False,
             'auto_reboot_time': '02:00',
             'update_package_lists': True,
+            'apt_update_ttl': 3600,  # Skip apt update if lists refreshed this recently (0 = always)
             'unattended_upgrade': True,
             'auto_remove': True,
             'auto_clean': True,
@@ -59,13 +207,92 @@ class DebianUpdater:
             'package_blacklist': [],
             'pre_update_health_check': True,
             'post_update_health_check': True,
-            'backup_important_configs': True
+            'health_check_ttl': 60,  # seconds a health check result may be reused
+            'backup_important_configs': True,
+            'fsync_method': 'batch',  # batch (one syncfs), per-file (fsync), or none
+            'cpu_affinity': None,  # CPUs to confine apt and dpkg to (None = all)
+            'io_class': None  # I/O class for apt and dpkg: idle, best-effort, realtime, or None
         }
         
         if config:
             self.config.update(config)
         
-        self.health_checker = HealthChecker(self.logger)
+        # The configuration is fixed for the updater's lifetime; resolve the
+        # per-cycle switches once instead of on every cycle
+        self._run_pre_check = self.config['pre_update_health_check']
+        self._run_post_check = self.config['post_update_health_check']
+        self._refresh_lists = self.config['update_package_lists']
+        self._run_backup = self.config['backup_important_configs']
+        self._run_upgrade = self.config['unattended_upgrade']
+        self._auto_reboot = self.config['auto_reboot']
+        self._cleanup_steps = tuple((name, command, message)
+                                    for flag, name, command, message in CLEANUP_STEPS
+                                    if self.config[flag])
+        
+        self.health_checker = HealthChecker(self.logger,
+                                            ttl_seconds=self.config['health_check_ttl'])
+        
+        # Already root (cron, or main() re-executed under sudo): no per-command sudo
+        self._sudo = [] if os.geteuid() == 0 else ['sudo']
+        # sudo resets the environment, so hand APT_ENV through env(1)
+        self._apt_sudo = (self._sudo + ['env'] + [f'{k}={v}' for k, v in APT_ENV.items()]
+                          if self._sudo else [])
+        # apt update, unattended-upgrade and cleanup run under the configured
+        # CPU and I/O limits; the updater process itself is left alone
+        self._apt_sudo += self._resource_limit_prefix()
+        
+        # Last rendered unattended-upgrades config, and last content/mtime written
+        self._unattended_render: Optional[Tuple[tuple, str]] = None
+        self._unattended_written: Optional[Tuple[str, int]] = None
+        
+        # Watch before reading the flag so no change in between is missed;
+        # the watch lives until close()
+        self._reboot_watch = self._watch_reboot_required()
+        self._reboot_required = os.path.exists(REBOOT_REQUIRED_FILE)
+        self._updates_cache: Optional[Tuple[List[int], Dict[str, List[str]]]] = None
+    
+    def _resource_limit_prefix(self) -> List[str]:
+        """
+        Build the taskset/ionice prefix applying the configured limits to apt.
+        
+        Returns:
+            Command prefix, empty when no limits are configured or the tools
+            are missing
+        """
+        prefix = []
+        
+        cpu_affinity = self.config['cpu_affinity']
+        if cpu_affinity:
+            if shutil.which('taskset'):
+                cpus = ','.join(str(cpu) for cpu in sorted(set(cpu_affinity)))
+                prefix += ['taskset', '--cpu-list', cpus]
+                self.logger.debug(f"Pinning apt and dpkg to CPUs {cpus}")
+            else:
+                self.logger.warning("taskset not found, leaving CPU affinity unchanged")
+        
+        io_class = self.config['io_class']
+        if io_class:
+            if io_class not in IO_CLASSES:
+                self.logger.warning(f"Unknown I/O scheduling class: {io_class}")
+            elif shutil.which('ionice'):
+                prefix += ['ionice', '-c', str(IO_CLASSES[io_class])]
+                self.logger.debug(f"Running apt and dpkg in I/O scheduling class {io_class}")
+            else:
+                self.logger.warning("ionice not found, leaving I/O scheduling class unchanged")
+        
+        return prefix
+    
+    def close(self):
+        """Release the reboot-required watch; later checks fall back to stat()."""
+        if self._reboot_watch is not None:
+            self._reboot_watch.close()
+            self._reboot_watch = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
     
     def run_update_cycle(self) -> Dict[str, any]:
         """
@@ -76,78 +303,80 @@ class DebianUpdater:
         """
         self.logger.info("Starting Debian/Ubuntu update cycle")
         
-        results = {
-            'timestamp': datetime.now().isoformat(),
-            'os_info': self.os_info,
-            'pre_update_health': None,
-            'package_list_update': None,
-            'available_updates': None,
-            'update_execution': None,
-            'cleanup': None,
-            'post_update_health': None,
-            'reboot_required': False,
-            'overall_status': 'success'
-        }
+        results = DebianUpdateResults(timestamp=time.time_ns(),
+                                      os_info=self.os_info)
         
         try:
-            # Pre-update health check
-            if self.config['pre_update_health_check']:
-                self.logger.info("Running pre-update health check")
-                results['pre_update_health'] = self.health_checker.run_all_checks()
+            # The health check probes local state and apt update is network
+            # bound, so run them side by side; nothing is installed until
+            # both have finished and the health check has passed
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                health_future = None
+                lists_future = None
+                
+                if self._run_pre_check:
+                    self.logger.info("Running pre-update health check")
+                    health_future = executor.submit(self.health_checker.run_all_checks)
+                
+                if self._refresh_lists:
+                    self.logger.info("Updating package lists")
+                    lists_future = executor.submit(self._update_package_lists)
                 
-                if results['pre_update_health']['overall_status'] == 'critical':
-                    self.logger.error("Pre-update health check failed critically. Aborting update.")
-                    results['overall_status'] = 'aborted'
-                    return results
+                if lists_future is not None:
+                    results.package_list_update = lists_future.result()
+                if health_future is not None:
+                    results.pre_update_health = health_future.result()
             
-            # Update package lists
-            if self.config['update_package_lists']:
-                self.logger.info("Updating package lists")
-                results['package_list_update'] = self._update_package_lists()
+            if (results.pre_update_health and
+                    results.pre_update_health['overall_status'] == 'critical'):
+                self.logger.error("Pre-update health check failed critically. Aborting update.")
+                results.overall_status = 'aborted'
+                return results.to_dict()
             
             # Get available updates
             self.logger.info("Checking for available updates")
-            results['available_updates'] = self._check_available_updates()
+            results.available_updates = self._check_available_updates()
             
-            if not results['available_updates']['has_updates']:
+            if not results.available_updates['has_updates']:
                 self.logger.info("No updates available")
-                results['overall_status'] = 'no_updates'
-                return results
+                results.overall_status = 'no_updates'
+                return results.to_dict()
             
             # Backup important configurations
-            if self.config['backup_important_configs']:
+            if self._run_backup:
                 self.logger.info("Backing up important configurations")
                 self._backup_configs()
             
             # Run unattended upgrades
-            if self.config['unattended_upgrade']:
+            if self._run_upgrade:
                 self.logger.info("Running unattended upgrades")
-                results['update_execution'] = self._run_unattended_upgrade()
+                results.update_execution = self._run_unattended_upgrade()
             
             # Cleanup
-            if self.config['auto_remove'] or self.config['auto_clean']:
+            if self._cleanup_steps:
                 self.logger.info("Running cleanup tasks")
-                results['cleanup'] = self._cleanup_system()
+                results.cleanup = self._cleanup_system()
             
             # Check if reboot is required
-            results['reboot_required'] = self._check_reboot_required()
+            results.reboot_required = self._check_reboot_required()
             
             # Post-update health check
-            if self.config['post_update_health_check']:
+            if self._run_post_check:
                 self.logger.info("Running post-update health check")
-                results['post_update_health'] = self.health_checker.run_all_checks()
+                # Packages just changed; never report pre-update results
+                results.post_update_health = self.health_checker.run_all_checks(force=True)
             
             # Handle automatic reboot if configured
-            if results['reboot_required'] and self.config['auto_reboot']:
+            if results.reboot_required and self._auto_reboot:
                 self._schedule_reboot()
             
         except Exception as e:
             self.logger.error(f"Update cycle failed: {e}")
-            results['overall_status'] = 'failed'
-            results['error'] = str(e)
+            results.overall_status = 'failed'
+            results.error = str(e)
         
-        self.logger.info(f"Update cycle completed with status: {results['overall_status']}")
-        return results
+        self.logger.info(f"Update cycle completed with status: {results.overall_status}")
+        return results.to_dict()
     
     def _update_package_lists(self) -> Dict[str, any]:
         """
@@ -156,11 +385,22 @@ class DebianUpdater:
         Returns:
             Dictionary with update results
         """
+        ttl = self.config['apt_update_ttl']
+        if ttl > 0:
+            try:
+                age = time.time() - os.stat(APT_UPDATE_STAMP).st_mtime
+            except OSError:
+                age = float('inf')
+            if age < ttl:
+                self.logger.info(f"Package lists refreshed {int(age)}s ago, skipping apt update")
+                return {'status': 'cached', 'age_seconds': int(age)}
+        
         try:
             # Run apt update
             code, stdout, stderr = CommandRunner.run_command(
-                ['sudo', 'apt', 'update'],
-                timeout=300
+                self._apt_sudo + ['apt', 'update'],
+                timeout=300,
+                env=APT_ENV
             )
             
             return {
@@ -186,25 +426,7 @@ class DebianUpdater:
             Dictionary with available updates information
         """
         try:
-            # Get list of upgradeable packages
-            code, stdout, stderr = CommandRunner.run_command(
-                ['apt', 'list', '--upgradable'],
-                check_return_code=False
-            )
-            
-            # Parse output to get package list
-            lines = stdout.strip().split('\n')[1:]  # Skip header
-            upgradeable_packages = []
-            
-            for line in lines:
-                if line.strip() and '/' in line:
-                    parts = line.split()
-                    if len(parts) >= 2:
-                        package_name = parts[0].split('/')[0]
-                        upgradeable_packages.append(package_name)
-            
-            # Get security updates specifically
-            security_updates = self._get_security_updates()
+            upgradeable_packages, security_updates = self._scan_updates()
             
             return {
                 'has_updates': len(upgradeable_packages) > 0,
@@ -221,6 +443,110 @@ class DebianUpdater:
                 'error': str(e)
             }
     
+    def _scan_updates(self) -> Tuple[List[str], List[str]]:
+        """
+        Get the upgradable and security-upgradable packages, reusing the last
+        answer while apt's package cache and dpkg's status file are unchanged.
+        
+        The answer is kept in memory and in UPGRADABLE_CACHE_FILE, so
+        back-to-back invocations skip the query entirely.
+        
+        Returns:
+            Tuple of (upgradable package names, security package names)
+        """
+        state = self._apt_state_key()
+        if state is None:
+            return self._query_updates()
+        
+        if self._updates_cache is not None and self._updates_cache[0] == state:
+            cached = self._updates_cache[1]
+            return cached['packages'], cached['security']
+        
+        try:
+            with open(UPGRADABLE_CACHE_FILE, 'r') as f:
+                cached = json.load(f)
+            if cached.get('state') == state:
+                packages, security = cached['packages'], cached['security']
+                self._updates_cache = (state, {'packages': packages, 'security': security})
+                self.logger.debug("apt state unchanged, reusing upgradable package list")
+                return packages, security
+        except (OSError, ValueError, KeyError):
+            pass
+        
+        packages, security = self._query_updates()
+        self._updates_cache = (state, {'packages': packages, 'security': security})
+        
+        try:
+            os.makedirs(os.path.dirname(UPGRADABLE_CACHE_FILE), exist_ok=True)
+            with open(UPGRADABLE_CACHE_FILE, 'wb') as f:
+                f.write(results_to_json({'state': state, 'packages': packages,
+                                         'security': security}))
+        except OSError as e:
+            self.logger.debug(f"Could not write upgradable package cache: {e}")
+        
+        return packages, security
+    
+    @staticmethod
+    def _apt_state_key() -> Optional[List[int]]:
+        """
+        Fingerprint the apt and dpkg state that decides what is upgradable.
+        
+        Returns:
+            List of modification times in nanoseconds, or None if unavailable
+        """
+        try:
+            return [os.stat(APT_PKGCACHE_PATH).st_mtime_ns,
+                    os.stat(DPKG_STATUS_PATH).st_mtime_ns]
+        except OSError:
+            return None
+    
+    def _query_updates(self) -> Tuple[List[str], List[str]]:
+        """
+        Ask apt which packages are upgradable and which of those are
+        security updates.
+        
+        With python-apt both come from a single pass over apt_pkg's
+        dependency cache, classifying each candidate version by the archives
+        of the package files it comes from. Otherwise
+        `apt list --upgradable` is parsed and security updates are taken
+        from an unattended-upgrade dry run.
+        
+        Returns:
+            Tuple of (upgradable package names, security package names)
+        """
+        if HAS_APT_PKG:
+            apt_pkg.init()
+            cache = apt_pkg.Cache(None)  # None suppresses the progress output
+            depcache = apt_pkg.DepCache(cache)
+            
+            # The loop visits every known package, so bind lookups once
+            packages = []
+            security = []
+            is_upgradable = depcache.is_upgradable
+            get_candidate_ver = depcache.get_candidate_ver
+            suffix = SECURITY_ARCHIVE_SUFFIX
+            for pkg in cache.packages:
+                if pkg.current_ver is None or not is_upgradable(pkg):
+                    continue
+                name = pkg.name
+                packages.append(name)
+                if any(package_file.archive.endswith(suffix)
+                       for package_file, _ in get_candidate_ver(pkg).file_list):
+                    security.append(name)
+            return packages, security
+        
+        # Stream the listing; every package line is "name/suite version arch ..."
+        # while the "Listing..." header has no slash. APT_ENV keeps apt's
+        # output unlocalised.
+        upgradeable_packages = []
+        for line in CommandRunner.stream_lines(['apt', 'list', '--upgradable'],
+                                               env=APT_ENV):
+            name, slash, _ = line.partition('/')
+            if slash and name:
+                upgradeable_packages.append(name)
+        
+        return upgradeable_packages, self._get_security_updates()
+    
     def _get_security_updates(self) -> List[str]:
         """
         Get list of available security updates.
@@ -229,26 +555,19 @@ class DebianUpdater:
             List of packages with security updates
         """
         try:
-            # Use unattended-upgrade --dry-run to see what would be upgraded
-            code, stdout, stderr = CommandRunner.run_command(
-                ['sudo', 'unattended-upgrade', '--dry-run', '--debug'],
-                timeout=120,
-                check_return_code=False
-            )
-            
+            # A simulated upgrade lists one compact "Inst" line per package,
+            # naming the archives its new version comes from; no root needed
             security_packages = []
-            lines = stdout.split('\n')
-            
-            for line in lines:
-                if 'security' in line.lower() and 'upgrade' in line.lower():
-                    # Extract package name from debug output
-                    # This is a simplified parser - actual format may vary
-                    words = line.split()
-                    for word in words:
-                        if '/' in word and not word.startswith('/'):
-                            package = word.split('/')[0]
-                            if package not in security_packages:
-                                security_packages.append(package)
+            match_inst = INST_LINE_PATTERN.match
+            for line in CommandRunner.stream_lines(
+                    ['apt-get', '-s', 'dist-upgrade',
+                     '-o', 'APT::Get::Show-User-Simulation-Note=false'],
+                    env=APT_ENV):
+                if not line.startswith('Inst '):
+                    continue
+                match = match_inst(line)
+                if match and SECURITY_ARCHIVE_SUFFIX in match.group(3):
+                    security_packages.append(match.group(1))
             
             return security_packages
             
@@ -269,8 +588,9 @@ class DebianUpdater:
             
             # Run unattended-upgrade
             code, stdout, stderr = CommandRunner.run_command(
-                ['sudo', 'unattended-upgrade', '--verbose'],
-                timeout=1800  # 30 minutes
+                self._apt_sudo + ['unattended-upgrade', '--verbose'],
+                timeout=1800,  # 30 minutes
+                env=APT_ENV
             )
             
             return {
@@ -292,91 +612,155 @@ class DebianUpdater:
     
     def _configure_unattended_upgrades(self):
         """Configure unattended-upgrades based on our settings."""
-        config_content = f'''// Automatically upgrade packages from these origin patterns
-Unattended-Upgrade::Allowed-Origins {{
-{chr(10).join([f'    "{origin}";' for origin in self.config['allowed_origins']])}
-}};
-
-// List of packages to not update (regexp are supported)
-Unattended-Upgrade::Package-Blacklist {{
-{chr(10).join([f'    "{pkg}";' for pkg in self.config['package_blacklist']])}
-}};
-
-// Auto-remove unused dependencies
-Unattended-Upgrade::Remove-Unused-Dependencies "{str(self.config['auto_remove']).lower()}";
-
-// Automatically reboot if required
-Unattended-Upgrade::Automatic-Reboot "{str(self.config['auto_reboot']).lower()}";
-
-// Automatically reboot time
-Unattended-Upgrade::Automatic-Reboot-Time "{self.config['auto_reboot_time']}";
-
-// Send email on errors
-Unattended-Upgrade::Mail "{self.config['mail_to'] if self.config['mail_on_error'] else ''}";
-'''
+        config_content = self._render_unattended_upgrades_config()
         
-        # Write configuration file
-        config_path = '/etc/apt/apt.conf.d/50unattended-upgrades'
-        temp_path = '/tmp/50unattended-upgrades'
+        # Leave the file alone when it already holds exactly this content
+        try:
+            mtime = os.stat(UNATTENDED_UPGRADES_CONF).st_mtime_ns
+            if (self._unattended_written == (config_content, mtime)
+                    or self._read_text(UNATTENDED_UPGRADES_CONF) == config_content):
+                self._unattended_written = (config_content, mtime)
+                self.logger.debug("Unattended-upgrades configuration unchanged")
+                return
+        except OSError:
+            pass
         
         try:
-            with open(temp_path, 'w') as f:
-                f.write(config_content)
-            
-            # Copy to proper location with sudo
-            CommandRunner.run_command(['sudo', 'cp', temp_path, config_path])
-            CommandRunner.run_command(['sudo', 'chmod', '644', config_path])
-            
-            # Clean up temp file
-            os.unlink(temp_path)
-            
+            if not self._sudo:
+                self._write_file_atomic(UNATTENDED_UPGRADES_CONF, config_content)
+            else:
+                # Stage outside /etc and let one privileged install place it
+                fd, temp_path = tempfile.mkstemp(prefix='50unattended-upgrades.')
+                try:
+                    with os.fdopen(fd, 'w') as f:
+                        f.write(config_content)
+                    CommandRunner.run_command(
+                        self._sudo + ['install', '-m', '644', temp_path, UNATTENDED_UPGRADES_CONF])
+                finally:
+                    os.unlink(temp_path)
+            
+            self._unattended_written = (config_content,
+                                        os.stat(UNATTENDED_UPGRADES_CONF).st_mtime_ns)
             self.logger.info("Unattended-upgrades configuration updated")
             
         except Exception as e:
             self.logger.warning(f"Could not update unattended-upgrades config: {e}")
     
+    def _render_unattended_upgrades_config(self) -> str:
+        """
+        Render the unattended-upgrades configuration, reusing the last
+        rendering while the settings it depends on are unchanged.
+        
+        Returns:
+            Configuration file content
+        """
+        config = self.config
+        key = (tuple(config['allowed_origins']), tuple(config['package_blacklist']),
+               config['auto_remove'], config['auto_reboot'], config['auto_reboot_time'],
+               config['mail_to'] if config['mail_on_error'] else '')
+        
+        if self._unattended_render is None or self._unattended_render[0] != key:
+            origins, blacklist, auto_remove, auto_reboot, reboot_time, mail = key
+            content = UNATTENDED_UPGRADES_TEMPLATE.format(
+                origins='\n'.join(f'    "{origin}";' for origin in origins),
+                blacklist='\n'.join(f'    "{pkg}";' for pkg in blacklist),
+                auto_remove=str(auto_remove).lower(),
+                auto_reboot=str(auto_reboot).lower(),
+                reboot_time=reboot_time,
+                mail=mail
+            )
+            self._unattended_render = (key, content)
+        
+        return self._unattended_render[1]
+    
+    @staticmethod
+    def _read_text(path: str) -> str:
+        """Return the content of a text file."""
+        with open(path, 'r') as f:
+            return f.read()
+    
+    @staticmethod
+    def _write_file_atomic(path: str, content: str, mode: int = 0o644):
+        """
+        Replace a file atomically with a temp file in the same directory.
+        
+        The temp name ends in '~', which apt silently ignores, so a
+        concurrent apt run never parses a half-written apt.conf.d entry.
+        
+        Args:
+            path: Destination path
+            content: New file content
+            mode: Permission bits for the new file
+        """
+        directory, name = os.path.split(path)
+        fd, temp_path = tempfile.mkstemp(prefix=f'.{name}.', suffix='~', dir=directory)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(content)
+                os.fchmod(f.fileno(), mode)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+    
     def _cleanup_system(self) -> Dict[str, any]:
         """
         Clean up the system by removing unused packages and cleaning cache.
         
+        Both steps run in one privileged shell; each step echoes a marker
+        line first so its output can be attributed afterwards.
+        
         Returns:
             Dictionary with cleanup results
         """
+        steps = self._cleanup_steps
+        for _, _, message in steps:
+            self.logger.info(message)
+        
         results = {}
+        if not steps:
+            return results
         
+        script = ' && '.join(f'echo {CLEANUP_STEP_MARKER}{name} && {command}'
+                             for name, command, _ in steps)
         try:
-            # Auto-remove unused packages
-            if self.config['auto_remove']:
-                self.logger.info("Removing unused packages")
-                code, stdout, stderr = CommandRunner.run_command(
-                    ['sudo', 'apt', 'autoremove', '-y'],
-                    timeout=300
-                )
-                results['autoremove'] = {
-                    'status': 'success',
-                    'return_code': code,
-                    'output': stdout
-                }
-            
-            # Clean package cache
-            if self.config['auto_clean']:
-                self.logger.info("Cleaning package cache")
-                code, stdout, stderr = CommandRunner.run_command(
-                    ['sudo', 'apt', 'autoclean'],
-                    timeout=300
-                )
-                results['autoclean'] = {
-                    'status': 'success',
-                    'return_code': code,
-                    'output': stdout
-                }
-            
-            return results
-            
-        except subprocess.CalledProcessError as e:
+            code, stdout, stderr = CommandRunner.run_command(
+                self._apt_sudo + ['sh', '-c', script],
+                timeout=600,
+                check_return_code=False,
+                env=APT_ENV
+            )
+        except subprocess.TimeoutExpired as e:
             self.logger.error(f"Cleanup failed: {e}")
             results['error'] = str(e)
             return results
+        
+        outputs = {}
+        current = None
+        for line in stdout.splitlines(keepends=True):
+            if line.startswith(CLEANUP_STEP_MARKER):
+                current = line[len(CLEANUP_STEP_MARKER):].strip()
+                outputs[current] = []
+            elif current is not None:
+                outputs[current].append(line)
+        
+        for name, lines in outputs.items():
+            results[name] = {
+                'status': 'success',
+                'return_code': 0,
+                'output': ''.join(lines)
+            }
+        
+        # '&&' stops at the first failure, which is the last step that started
+        if code != 0:
+            failed = current or steps[0][0]
+            results.setdefault(failed, {'output': ''}).update(status='failed', return_code=code)
+            self.logger.error(f"Cleanup failed during {failed}: {stderr.strip()}")
+            results['error'] = f"{failed} failed with return code {code}: {stderr.strip()}"
+        
+        return results
     
     def _check_reboot_required(self) -> bool:
         """
@@ -385,8 +769,42 @@ Unattended-Upgrade::Mail "{self.config['mail_to'] if self.config['mail_on_error'
         Returns:
             Boolean indicating if reboot is required
         """
-        reboot_required_file = '/var/run/reboot-required'
-        return os.path.exists(reboot_required_file)
+        if self._reboot_watch is None:
+            return os.path.exists(REBOOT_REQUIRED_FILE)
+        
+        # Apply only the changes seen since the last call
+        name = os.path.basename(REBOOT_REQUIRED_FILE)
+        for event in self._reboot_watch.read(timeout=0):
+            if event.mask & inotify_flags.Q_OVERFLOW:
+                # Events were dropped; only the file itself is reliable now
+                self._reboot_required = os.path.exists(REBOOT_REQUIRED_FILE)
+            elif event.name == name:
+                self._reboot_required = bool(event.mask & (inotify_flags.CREATE |
+                                                           inotify_flags.MOVED_TO))
+        return self._reboot_required
+    
+    def _watch_reboot_required(self):
+        """
+        Watch the reboot-required flag's directory for changes.
+        
+        A long-running updater then learns about the flag from events
+        instead of checking for the file on every cycle. The watch is
+        released by close().
+        
+        Returns:
+            INotify instance, or None if inotify is unavailable
+        """
+        if not HAS_INOTIFY:
+            return None
+        try:
+            watch = INotify()
+            watch.add_watch(os.path.dirname(os.path.realpath(REBOOT_REQUIRED_FILE)),
+                            inotify_flags.CREATE | inotify_flags.MOVED_TO |
+                            inotify_flags.DELETE | inotify_flags.MOVED_FROM)
+            return watch
+        except OSError as e:
+            self.logger.debug(f"inotify unavailable, polling for reboot flag: {e}")
+            return None
     
     def _schedule_reboot(self):
         """Schedule a system reboot."""
@@ -395,8 +813,8 @@ Unattended-Upgrade::Mail "{self.config['mail_to'] if self.config['mail_on_error'
             self.logger.warning(f"Scheduling system reboot at {reboot_time}")
             
             # Schedule reboot using at command
-            CommandRunner.run_command([
-                'sudo', 'sh', '-c', 
+            CommandRunner.run_command(self._sudo + [
+                'sh', '-c',
                 f'echo "systemctl reboot" | at {reboot_time}'
             ])
             
@@ -406,31 +824,99 @@ Unattended-Upgrade::Mail "{self.config['mail_to'] if self.config['mail_on_error'
     def _backup_configs(self):
         """Backup important configuration files before updates."""
         try:
-            backup_dir = f"/tmp/config_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-            os.makedirs(backup_dir, exist_ok=True)
-            
-            # Important files to backup
-            important_files = [
-                '/etc/apt/sources.list',
-                '/etc/apt/sources.list.d/',
-                '/etc/ssh/sshd_config',
-                '/etc/fstab',
-                '/etc/crontab'
-            ]
+            existing_files = [path for path in BACKUP_CONFIG_FILES if os.path.exists(path)]
+            if not existing_files:
+                self.logger.warning("No configuration files found to back up")
+                return
+            
+            # One archive, one privileged process; zstd when available. tar
+            # only gained --zstd in 1.31, so hand it the program instead
+            if shutil.which('zstd'):
+                compress_flag, extension = '--use-compress-program=zstd', 'tar.zst'
+            else:
+                compress_flag, extension = '--gzip', 'tar.gz'
+            # A private 0700 directory keeps the archive of root-only files
+            # away from other users and unique across concurrent runs
+            backup_dir = tempfile.mkdtemp(prefix='config_backup_')
+            backup_file = os.path.join(backup_dir, f"config_backup_{time.time_ns()}.{extension}")
+            
+            # --ignore-failed-read keeps going past unreadable files, warning
+            # on stderr as the per-file copies used to
+            code, stdout, stderr = CommandRunner.run_command(
+                self._sudo + ['tar', '--create', compress_flag, '--file', backup_file,
+                 '--ignore-failed-read'] + existing_files,
+                check_return_code=False
+            )
+            for line in stderr.splitlines():
+                if 'Removing leading' not in line:
+                    self.logger.warning(f"Backup: {line}")
             
-            for file_path in important_files:
-                if os.path.exists(file_path):
-                    try:
-                        CommandRunner.run_command([
-                            'sudo', 'cp', '-r', file_path, backup_dir
-                        ])
-                    except Exception as e:
-                        self.logger.warning(f"Could not backup {file_path}: {e}")
+            if code != 0:
+                self.logger.warning(f"Configuration backup exited with code {code}")
+                return
             
-            self.logger.info(f"Configuration backup created in {backup_dir}")
+            self._sync_backup(backup_file)
+            self.logger.info(f"Configuration backup created at {backup_file}")
             
         except Exception as e:
             self.logger.warning(f"Could not create configuration backup: {e}")
+    
+    def _sync_backup(self, path: str):
+        """
+        Flush a finished backup to stable storage per the fsync_method setting.
+        
+        'batch' issues one syncfs() for the filesystem holding the backup,
+        'per-file' fsyncs the backup itself and 'none' leaves it to the kernel.
+        
+        Args:
+            path: Path of the backup file
+        """
+        method = self.config['fsync_method']
+        if method == 'none':
+            return
+        
+        try:
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                if method != 'batch' or not _syncfs(fd):
+                    os.fsync(fd)
+            finally:
+                os.close(fd)
+        except OSError as e:
+            self.logger.warning(f"Could not sync configuration backup: {e}")
+
+
+def _syncfs(fd: int) -> bool:
+    """
+    Call syncfs(2) on the filesystem containing an open file.
+    
+    Args:
+        fd: Open file descriptor
+        
+    Returns:
+        True if syncfs succeeded, False if it is unavailable or failed
+    """
+    try:
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)
+        return libc.syncfs(fd) == 0
+    except (OSError, AttributeError):
+        return False
+
+
+def results_to_json(results: Dict[str, any]) -> bytes:
+    """
+    Serialize update results to JSON, using orjson when it is installed.
+    
+    Args:
+        results: Results dictionary from run_update_cycle()
+        
+    Returns:
+        UTF-8 encoded JSON document
+    """
+    if HAS_ORJSON:
+        return orjson.dumps(results, default=str)
+    return json.dumps(results, default=str).encode('utf-8')
 
 
 def main():
@@ -444,11 +930,29 @@ def main():
     parser.add_argument('--verbose', action='store_true',
                        help='Enable verbose logging')
     
+    parser.add_argument('--no-elevate', action='store_true',
+                       help='Do not re-run under sudo; prefix each privileged command instead')
+    parser.add_argument('--json', action='store_true',
+                       help='Write full results as JSON to stdout')
+    
     args = parser.parse_args()
     
-    # Setup logging
+    # Escalate once for the whole run rather than once per command. A dry
+    # run changes nothing, so it does not need root.
+    if (os.geteuid() != 0 and not args.no_elevate and not args.dry_run
+            and shutil.which('sudo')):
+        if sys.stdin.isatty():
+            os.execvp('sudo', ['sudo', sys.executable] + sys.argv)
+        # Nobody can answer a password prompt (timer, cron): only re-exec if
+        # sudo needs none, else keep per-command sudo
+        code, _, _ = CommandRunner.run_command(['sudo', '-n', 'true'],
+                                               timeout=10, check_return_code=False)
+        if code == 0:
+            os.execvp('sudo', ['sudo', '-n', sys.executable] + sys.argv)
+    
+    # Setup logging (keep stdout clean for JSON output)
     log_level = 'DEBUG' if args.verbose else 'INFO'
-    logger = LogManager.setup_logging(log_level)
+    logger = LogManager.setup_logging(log_level, console_output=not args.json)
     
     # Load configuration
     config = {}
@@ -468,8 +972,12 @@ def main():
     
     try:
         # Create updater and run update cycle
-        updater = DebianUpdater(config, logger)
-        results = updater.run_update_cycle()
+        with DebianUpdater(config, logger) as updater:
+            results = updater.run_update_cycle()
+        
+        if args.json:
+            sys.stdout.buffer.write(results_to_json(results) + b'\n')
+            sys.exit(0 if results['overall_status'] in ['success', 'no_updates'] else 1)
         
         # Print summary
         print(f"\n=== Debian/Ubuntu Update Results ===")
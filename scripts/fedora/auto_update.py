@@ -8,18 +8,98 @@ Date: November 2025
 """
 
 import os
+import re
 import sys
 import subprocess
+import shutil
 import json
+import select
+import signal
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import cmp_to_key, lru_cache
 from typing import Dict, List, Optional, Tuple
 import logging
 
+try:
+    import dnf
+    HAS_DNF = True
+except ImportError:
+    HAS_DNF = False
+
+try:
+    import rpm
+    HAS_RPM = True
+except ImportError:
+    HAS_RPM = False
+
 # Add parent directories to path for imports
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 from utils.system_utils import OSDetector, CommandRunner, LogManager
 from scripts.common.health_checks import HealthChecker
 
+# Configuration files and directories archived before updating
+BACKUP_CONFIG_FILES = (
+    '/etc/dnf/dnf.conf',
+    '/etc/yum.conf',
+    '/etc/yum.repos.d/',
+    '/etc/ssh/sshd_config',
+    '/etc/fstab',
+    '/etc/crontab'
+)
+
+# dnf/yum list row: "name.arch  [epoch:]version-release  repo"; headers and
+# "Last metadata expiration check" lines have no "name.arch" first column
+PACKAGE_LINE_PATTERN = re.compile(r'^(\S+)\.([^.\s]+)\s+(\S+)\s+\S+')
+
+# updateinfo list row: "ADVISORY  Severity/Sec.  name-[epoch:]version-release.arch"
+SECURITY_LINE_PATTERN = re.compile(r'^\S+\s+\S+\s+(\S+)-[^-\s]+-[^-\s]+\.[^.\s]+\s*$')
+
+# rpm query format for installed kernels: install time, then E V R and arch
+KERNEL_QUERY_FORMAT = '%{INSTALLTIME} %{EPOCHNUM} %{VERSION} %{RELEASE} %{ARCH}\n'
+
+# Lines of dnf/yum update output kept in the results
+UPDATE_OUTPUT_TAIL_LINES = 200
+
+# Seconds a timed-out update gets to exit after SIGTERM before SIGKILL
+UPDATE_KILL_GRACE_SECONDS = 30
+
+# Enabled repositories named in the repository status
+REPOSITORY_LIST_LIMIT = 10
+
+
+@lru_cache(maxsize=32)
+def _have(command: str) -> bool:
+    """
+    Check once per process whether a command is on PATH.
+    
+    Args:
+        command: Command to check
+        
+    Returns:
+        Boolean indicating if command is available
+    """
+    return CommandRunner.is_command_available(command)
+
+
+@lru_cache(maxsize=1)
+def _detect_package_manager() -> str:
+    """
+    Detect available package manager (dnf or yum), once per process.
+    
+    Returns:
+        Name of package manager to use
+    """
+    if _have('dnf'):
+        return 'dnf'
+    elif _have('yum'):
+        return 'yum'
+    else:
+        raise Exception("Neither dnf nor yum package manager found")
+
 
 class FedoraUpdater:
     """Handles automatic updates for Fedora/RHEL systems."""
@@ -42,7 +122,7 @@ class FedoraUpdater:
                           f"Detected: {self.os_info['distro']}")
         
         # Determine package manager (dnf or yum)
-        self.package_manager = self._detect_package_manager()
+        self.package_manager = _detect_package_manager()
         
         # Default configuration
         self.config = {
@@ -57,6 +137,10 @@ class FedoraUpdater:
             'max_kernels_to_keep': 3,
             'update_firmware': False,
             'check_repositories': True,
+            # dnf already refetches metadata once metadata_expire passes;
+            # True wipes it every cycle (clean metadata, clean all) at the
+            # cost of a full metadata download each run
+            'force_refresh': False,
             'backup_important_configs': True,
             'pre_update_health_check': True,
             'post_update_health_check': True,
@@ -67,6 +151,20 @@ class FedoraUpdater:
             self.config.update(config)
         
         self.health_checker = HealthChecker(self.logger)
+        
+        # Set to ['-C'] once this cycle has refreshed the metadata, so
+        # read-only queries use the cache instead of revalidating it
+        self._cache_only_flag: List[str] = []
+        
+        # Enabled repository ids seen by the last in-process dnf query
+        self._enabled_repos: Optional[List[str]] = None
+        
+        # Background fwupd metadata refresh for the current cycle
+        self._fw_refresh_future = None
+        
+        # Fixed for the life of the process / set once per cycle
+        self._kernel_release = os.uname().release
+        self._cycle_ts: Optional[datetime] = None
     
     def run_update_cycle(self) -> Dict[str, any]:
         """
@@ -77,8 +175,10 @@ class FedoraUpdater:
         """
         self.logger.info(f"Starting {self.os_info['distro']} update cycle using {self.package_manager}")
         
+        self._cycle_ts = datetime.now()
+        
         results = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': self._cycle_ts.isoformat(),
             'os_info': self.os_info,
             'package_manager': self.package_manager,
             'pre_update_health': None,
@@ -92,30 +192,75 @@ class FedoraUpdater:
             'overall_status': 'success'
         }
         
+        background_executor = ThreadPoolExecutor(max_workers=2)
+        
         try:
-            # Pre-update health check
-            if self.config['pre_update_health_check']:
-                self.logger.info("Running pre-update health check")
-                results['pre_update_health'] = self.health_checker.run_all_checks()
-                
-                if results['pre_update_health']['overall_status'] == 'critical':
-                    self.logger.error("Pre-update health check failed critically. Aborting update.")
-                    results['overall_status'] = 'aborted'
-                    return results
+            # Fetch firmware metadata from LVFS while dnf does its own
+            # network work; _update_firmware waits for it
+            if self.config['update_firmware'] and _have('fwupdmgr'):
+                self._fw_refresh_future = background_executor.submit(
+                    self._refresh_firmware_metadata)
             
-            # Backup important configurations
+            # Nothing reads the backup, so it only has to finish before the
+            # first step that changes the system
+            backup_future = None
             if self.config['backup_important_configs']:
                 self.logger.info("Backing up important configurations")
-                self._backup_configs()
+                backup_future = background_executor.submit(self._backup_configs)
             
-            # Check and refresh repositories
-            if self.config['check_repositories']:
-                self.logger.info("Refreshing package repositories")
-                results['repository_refresh'] = self._refresh_repositories()
+            # The health check and metadata refresh are independent and spend
+            # their time waiting on subprocesses and the network, so run them
+            # side by side; nothing is installed until both have finished
+            # and the health check has passed
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                health_future = None
+                refresh_future = None
+                
+                if self.config['pre_update_health_check']:
+                    self.logger.info("Running pre-update health check")
+                    health_future = executor.submit(self.health_checker.run_all_checks)
+                
+                if self.config['check_repositories']:
+                    self.logger.info("Refreshing package repositories")
+                    refresh_future = executor.submit(self._refresh_repositories)
+                
+                if refresh_future is not None:
+                    results['repository_refresh'] = refresh_future.result()
+                if health_future is not None:
+                    results['pre_update_health'] = health_future.result()
             
-            # Check for available updates
+            if (results['pre_update_health'] and
+                    results['pre_update_health']['overall_status'] == 'critical'):
+                self.logger.error("Pre-update health check failed critically. Aborting update.")
+                results['overall_status'] = 'aborted'
+                return results
+            
+            # Check for available updates; the repository listing only reads
+            # the refreshed metadata, so gather it at the same time. The dnf
+            # API query sees the enabled repositories itself, making repolist
+            # unnecessary.
             self.logger.info("Checking for available updates")
-            results['available_updates'] = self._check_available_updates()
+            refresh = results['repository_refresh']
+            want_status = bool(refresh) and refresh['status'] == 'success'
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                status_future = None
+                if want_status and not self._uses_dnf_api:
+                    status_future = executor.submit(self._check_repository_status)
+                
+                results['available_updates'] = self._check_available_updates()
+                
+                if status_future is not None:
+                    refresh['repository_status'] = status_future.result()
+                elif want_status:
+                    if self._enabled_repos is not None:
+                        refresh['repository_status'] = self._summarize_repositories(
+                            self._enabled_repos)
+                    else:
+                        refresh['repository_status'] = self._check_repository_status()
+            
+            # Everything from here on may modify the backed-up files
+            if backup_future is not None:
+                backup_future.result()
             
             if not results['available_updates']['has_updates']:
                 self.logger.info("No updates available")
@@ -137,18 +282,26 @@ class FedoraUpdater:
                 self.logger.info("Running cleanup tasks")
                 results['cleanup'] = self._cleanup_system()
             
-            # Check if reboot is required
-            results['reboot_required'] = self._check_reboot_required()
-            
-            # Configure automatic updates if requested
+            # Configure automatic updates if requested; this installs
+            # dnf-automatic and enables its timer, so it must finish before
+            # the health check measures disk usage and services
             if self.config['enable_auto_updates']:
                 self.logger.info("Configuring automatic updates")
                 self._configure_auto_updates()
             
-            # Post-update health check
-            if self.config['post_update_health_check']:
-                self.logger.info("Running post-update health check")
-                results['post_update_health'] = self.health_checker.run_all_checks()
+            # The system is settled now. The post-update health check only
+            # observes it, so run it alongside the read-only reboot check.
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                health_future = None
+                if self.config['post_update_health_check']:
+                    self.logger.info("Running post-update health check")
+                    health_future = executor.submit(self.health_checker.run_all_checks, force=True)
+                
+                # Check if reboot is required
+                results['reboot_required'] = self._check_reboot_required()
+                
+                if health_future is not None:
+                    results['post_update_health'] = health_future.result()
             
             # Handle automatic reboot if configured
             if results['reboot_required'] and self.config['auto_reboot']:
@@ -159,50 +312,52 @@ class FedoraUpdater:
             results['overall_status'] = 'failed'
             results['error'] = str(e)
         
+        finally:
+            background_executor.shutdown(wait=True)
+            self._fw_refresh_future = None
+        
         self.logger.info(f"Update cycle completed with status: {results['overall_status']}")
         return results
     
-    def _detect_package_manager(self) -> str:
-        """
-        Detect available package manager (dnf or yum).
-        
-        Returns:
-            Name of package manager to use
-        """
-        if CommandRunner.is_command_available('dnf'):
-            return 'dnf'
-        elif CommandRunner.is_command_available('yum'):
-            return 'yum'
-        else:
-            raise Exception("Neither dnf nor yum package manager found")
-    
     def _refresh_repositories(self) -> Dict[str, any]:
         """
-        Refresh package repositories and check for issues.
+        Refresh package repositories.
+        
+        The repository status is gathered separately by run_update_cycle,
+        alongside the update check.
         
         Returns:
             Dictionary with repository refresh results
         """
+        self._cache_only_flag = []
         try:
-            # Clean metadata cache
-            code, stdout, stderr = CommandRunner.run_command(
-                ['sudo', self.package_manager, 'clean', 'metadata'],
-                timeout=120
-            )
+            # Only discard metadata when explicitly asked to; dnf can expire
+            # and refetch it in the same process
+            if self.config['force_refresh'] and self.package_manager != 'dnf':
+                code, stdout, stderr = CommandRunner.run_command(
+                    ['sudo', self.package_manager, 'clean', 'metadata'],
+                    timeout=120
+                )
             
-            # Refresh repository metadata
+            # Refresh repository metadata past metadata_expire. Not --timer:
+            # that returns success without fetching on battery, metered
+            # links or when timers are disabled, and the queries below
+            # trust the cache
+            if self.package_manager != 'dnf':
+                makecache = ['makecache', 'fast']
+            elif self.config['force_refresh']:
+                makecache = ['makecache', '--refresh']
+            else:
+                makecache = ['makecache']
             code, stdout, stderr = CommandRunner.run_command(
-                ['sudo', self.package_manager, 'makecache'],
+                ['sudo', self.package_manager] + makecache,
                 timeout=300
             )
-            
-            # Check repository status
-            repo_status = self._check_repository_status()
+            self._cache_only_flag = ['-C']
             
             return {
                 'status': 'success',
                 'return_code': code,
-                'repository_status': repo_status,
                 'stdout': stdout,
                 'stderr': stderr
             }
@@ -225,57 +380,63 @@ class FedoraUpdater:
         try:
             # List enabled repositories
             code, stdout, stderr = CommandRunner.run_command(
-                [self.package_manager, 'repolist', 'enabled'],
+                [self.package_manager] + self._cache_only_flag + ['repolist', 'enabled'],
                 check_return_code=False
             )
             
             enabled_repos = []
             if code == 0:
-                lines = stdout.strip().split('\n')[1:]  # Skip header
-                for line in lines:
-                    if line.strip() and not line.startswith('repo id'):
-                        parts = line.split()
-                        if len(parts) >= 1:
-                            enabled_repos.append(parts[0])
+                for line in stdout.splitlines():
+                    if not line or line.startswith('repo id') or line[0].isspace():
+                        continue
+                    enabled_repos.append(line.split(None, 1)[0])
             
-            return {
-                'enabled_repositories': len(enabled_repos),
-                'repositories': enabled_repos[:10]  # Limit output
-            }
+            return self._summarize_repositories(enabled_repos)
             
         except Exception as e:
             self.logger.warning(f"Could not check repository status: {e}")
             return {'error': str(e)}
     
+    @staticmethod
+    def _summarize_repositories(enabled_repos: List[str]) -> Dict[str, any]:
+        """
+        Build the repository status from the enabled repository ids.
+        
+        Args:
+            enabled_repos: Ids of all enabled repositories
+            
+        Returns:
+            Dictionary with repository information
+        """
+        return {
+            'enabled_repositories': len(enabled_repos),
+            'repositories': enabled_repos[:REPOSITORY_LIST_LIMIT]
+        }
+    
+    @property
+    def _uses_dnf_api(self) -> bool:
+        """Whether update queries go through the in-process dnf API."""
+        return HAS_DNF and self.package_manager == 'dnf'
+    
     def _check_available_updates(self) -> Dict[str, any]:
         """
         Check for available package updates.
         
+        When only security updates will be installed, those are all that
+        count, and the CLI path skips check-update entirely.
+        
         Returns:
             Dictionary with available updates information
         """
         try:
-            # Check for all updates
-            cmd = [self.package_manager, 'check-update']
-            code, stdout, stderr = CommandRunner.run_command(
-                cmd, check_return_code=False, timeout=300
-            )
-            
-            # Parse output to get package list
-            all_updates = []
-            security_updates = []
-            
-            if code == 100:  # dnf/yum returns 100 when updates are available
-                lines = stdout.strip().split('\n')
-                for line in lines:
-                    if line.strip() and not line.startswith('Last metadata') and '.' in line:
-                        parts = line.split()
-                        if len(parts) >= 2:
-                            package_name = parts[0].split('.')[0]
-                            all_updates.append(package_name)
-            
-            # Check for security updates specifically
-            security_updates = self._get_security_updates()
+            if not self.config['install_security_only']:
+                all_updates, security_updates = self._query_updates()
+            elif self._uses_dnf_api:
+                _, security_updates = self._query_updates()
+                all_updates = security_updates
+            else:
+                security_updates = self._get_security_updates()
+                all_updates = security_updates
             
             return {
                 'has_updates': len(all_updates) > 0,
@@ -292,6 +453,89 @@ class FedoraUpdater:
                 'error': str(e)
             }
     
+    def _query_updates(self) -> Tuple[List[str], List[str]]:
+        """
+        Get the upgradable and security-upgradable package names.
+        
+        With the dnf Python bindings both lists, and the enabled repositories,
+        come from a single in-process metadata load. Otherwise check-update
+        and updateinfo run side by side.
+        
+        Returns:
+            Tuple of (upgradable package names, security package names)
+        """
+        self._enabled_repos = None
+        if self._uses_dnf_api:
+            try:
+                all_updates, security_updates, self._enabled_repos = self._query_updates_dnf(
+                    cache_only=bool(self._cache_only_flag))
+                return all_updates, security_updates
+            except Exception as e:
+                self.logger.debug(f"dnf API query failed, falling back to the CLI: {e}")
+        
+        # Query security advisories in the background while
+        # check-update runs; both only read the metadata cache
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            security_future = executor.submit(self._get_security_updates)
+            all_updates = self._list_updates()
+            return all_updates, security_future.result()
+    
+    @staticmethod
+    def _query_updates_dnf(cache_only: bool = False) -> Tuple[List[str], List[str], List[str]]:
+        """
+        Get upgradable and security-upgradable packages through the dnf API.
+        
+        Args:
+            cache_only: Use the cached metadata without checking for expiry
+            
+        Returns:
+            Tuple of (upgradable package names, security package names,
+            enabled repository ids)
+        """
+        with dnf.Base() as base:
+            base.conf.read()
+            base.conf.cacheonly = cache_only
+            base.read_all_repos()
+            base.fill_sack(load_system_repo=True)
+            
+            upgrades = base.sack.query().upgrades()
+            all_updates = list(dict.fromkeys(pkg.name for pkg in upgrades.latest()))
+            # Match every pending build, as dnf --security does: the advisory
+            # may be on an intermediate build rather than the newest one
+            security_updates = list(dict.fromkeys(
+                pkg.name for pkg in upgrades.filter(advisory_type='security')))
+            enabled_repos = [repo.id for repo in base.repos.iter_enabled()]
+        
+        return all_updates, security_updates, enabled_repos
+    
+    def _list_updates(self) -> List[str]:
+        """
+        Get upgradable packages from dnf/yum check-update.
+        
+        Returns:
+            List of package names with updates
+        """
+        cmd = [self.package_manager] + self._cache_only_flag + ['check-update']
+        code, stdout, stderr = CommandRunner.run_command(
+            cmd, check_return_code=False, timeout=300
+        )
+        
+        # Parse output to get package list; multilib packages appear once
+        # per architecture, so keep each name once, in order
+        all_updates = {}
+        
+        if code == 100:  # dnf/yum returns 100 when updates are available
+            match_line = PACKAGE_LINE_PATTERN.match
+            for line in stdout.splitlines():
+                # Obsoletes are listed again below this header
+                if line.startswith('Obsoleting'):
+                    break
+                match = match_line(line)
+                if match:
+                    all_updates[match.group(1)] = None
+        
+        return list(all_updates)
+    
     def _get_security_updates(self) -> List[str]:
         """
         Get list of available security updates.
@@ -301,32 +545,23 @@ class FedoraUpdater:
         """
         try:
             # Use dnf/yum updateinfo to get security updates
-            if self.package_manager == 'dnf':
-                code, stdout, stderr = CommandRunner.run_command(
-                    ['dnf', 'updateinfo', 'list', 'security'],
-                    check_return_code=False,
-                    timeout=120
-                )
-            else:  # yum
-                code, stdout, stderr = CommandRunner.run_command(
-                    ['yum', 'updateinfo', 'list', 'security'],
-                    check_return_code=False,
-                    timeout=120
-                )
+            code, stdout, stderr = CommandRunner.run_command(
+                [self.package_manager] + self._cache_only_flag +
+                ['updateinfo', 'list', 'security'],
+                check_return_code=False,
+                timeout=120
+            )
             
-            security_packages = []
+            # One row per advisory and package; keep each name once, in order
+            security_packages = {}
             if code == 0:
-                lines = stdout.strip().split('\n')
-                for line in lines:
-                    if line.strip() and not line.startswith('Last metadata'):
-                        parts = line.split()
-                        if len(parts) >= 3:
-                            # Extract package name from update info
-                            package = parts[2].split('.')[0] if '.' in parts[2] else parts[2]
-                            if package not in security_packages:
-                                security_packages.append(package)
-            
-            return security_packages
+                match_line = SECURITY_LINE_PATTERN.match
+                for line in stdout.splitlines():
+                    match = match_line(line)
+                    if match:
+                        security_packages[match.group(1)] = None
+            
+            return list(security_packages)
             
         except Exception as e:
             self.logger.warning(f"Could not determine security updates: {e}")
@@ -336,6 +571,10 @@ class FedoraUpdater:
         """
         Update system packages using dnf/yum.
         
+        Output is streamed to the debug log as it arrives and only the last
+        UPDATE_OUTPUT_TAIL_LINES lines are kept, so memory stays flat however
+        large the transaction is.
+        
         Returns:
             Dictionary with update results
         """
@@ -351,30 +590,93 @@ class FedoraUpdater:
                 for pkg in self.config['exclude_packages']:
                     cmd.extend(['--exclude', pkg])
             
-            # Run the update
+            # Run the update in its own session so a timeout can signal dnf
+            # as well as sudo. dnf keeps the output pipe open, so reading
+            # stops at the deadline rather than when the pipe closes.
             timeout = self.config['timeout_minutes'] * 60
-            code, stdout, stderr = CommandRunner.run_command(
-                cmd, timeout=timeout
+            deadline = time.monotonic() + timeout
+            self.logger.debug(f"Executing command: {' '.join(cmd)}")
+            tail = deque(maxlen=UPDATE_OUTPUT_TAIL_LINES)
+            process = subprocess.Popen(
+                cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                start_new_session=True
             )
+            timed_out = False
+            with process.stdout:
+                fd = process.stdout.fileno()
+                partial = b''
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                        timed_out = True
+                        break
+                    chunk = os.read(fd, 65536)
+                    if not chunk:
+                        break
+                    *lines, partial = (partial + chunk).split(b'\n')
+                    for line in lines:
+                        line = line.decode(errors='replace')
+                        tail.append(line + '\n')
+                        self.logger.debug(line)
+                if partial:
+                    tail.append(partial.decode(errors='replace'))
+            
+            if timed_out:
+                self._stop_process_group(process)
+                code = process.returncode
+            else:
+                code = process.wait()
+            
+            if timed_out or code != 0:
+                error = (f"Update timed out after {timeout}s" if timed_out
+                         else f"Command failed with return code {code}")
+                self.logger.error(f"System package update failed: {error}")
+                return {
+                    'status': 'failed',
+                    'error': error,
+                    'return_code': code,
+                    'stdout_tail': ''.join(tail)
+                }
             
             return {
                 'status': 'success',
                 'return_code': code,
-                'stdout': stdout,
-                'stderr': stderr,
+                'stdout_tail': ''.join(tail),
                 'security_only': self.config['install_security_only']
             }
             
-        except subprocess.CalledProcessError as e:
+        except OSError as e:
             self.logger.error(f"System package update failed: {e}")
             return {
                 'status': 'failed',
-                'error': str(e),
-                'return_code': e.returncode,
-                'stdout': e.stdout if hasattr(e, 'stdout') else '',
-                'stderr': e.stderr if hasattr(e, 'stderr') else ''
+                'error': str(e)
             }
     
+    def _stop_process_group(self, process: subprocess.Popen):
+        """
+        Terminate a command started in its own session, escalating to SIGKILL.
+        
+        Under sudo only sudo itself may be signalled by an unprivileged
+        caller; it relays SIGTERM to the command it runs.
+        
+        Args:
+            process: Process leading the session
+        """
+        for sig in (signal.SIGTERM, signal.SIGKILL):
+            try:
+                os.killpg(process.pid, sig)
+            except OSError as e:  # already gone, or not ours to signal
+                self.logger.debug(f"Could not signal update process group: {e}")
+                break
+            try:
+                process.wait(timeout=UPDATE_KILL_GRACE_SECONDS)
+                return
+            except subprocess.TimeoutExpired:
+                continue
+        process.poll()
+    
     def _update_firmware(self) -> Dict[str, any]:
         """
         Update system firmware using fwupd.
@@ -383,15 +685,14 @@ class FedoraUpdater:
             Dictionary with firmware update results
         """
         try:
-            if not CommandRunner.is_command_available('fwupdmgr'):
+            if not _have('fwupdmgr'):
                 return {'status': 'skipped', 'reason': 'fwupdmgr not available'}
             
-            # Refresh firmware metadata
-            code, stdout, stderr = CommandRunner.run_command(
-                ['sudo', 'fwupdmgr', 'refresh'],
-                timeout=120,
-                check_return_code=False
-            )
+            # Refresh firmware metadata, unless already started in the background
+            if self._fw_refresh_future is not None:
+                self._fw_refresh_future.result()
+            else:
+                self._refresh_firmware_metadata()
             
             # Get firmware updates
             code, stdout, stderr = CommandRunner.run_command(
@@ -424,6 +725,15 @@ class FedoraUpdater:
             self.logger.warning(f"Firmware update failed: {e}")
             return {'status': 'failed', 'error': str(e)}
     
+    @staticmethod
+    def _refresh_firmware_metadata():
+        """Refresh the fwupd metadata from LVFS."""
+        CommandRunner.run_command(
+            ['sudo', 'fwupdmgr', 'refresh'],
+            timeout=120,
+            check_return_code=False
+        )
+    
     def _cleanup_system(self) -> Dict[str, any]:
         """
         Clean up the system by removing old packages and cleaning cache.
@@ -434,11 +744,13 @@ class FedoraUpdater:
         results = {}
         
         try:
-            # Clean package cache
+            # Clean package cache, keeping metadata for the next cycle
+            # unless a full refresh is forced anyway
             if self.config['clean_cache']:
                 self.logger.info("Cleaning package cache")
+                clean_target = 'all' if self.config['force_refresh'] else 'packages'
                 code, stdout, stderr = CommandRunner.run_command(
-                    ['sudo', self.package_manager, 'clean', 'all'],
+                    ['sudo', self.package_manager, 'clean', clean_target],
                     timeout=300
                 )
                 results['cache_cleanup'] = {
@@ -477,53 +789,74 @@ class FedoraUpdater:
         """
         Remove old kernel packages, keeping the specified number.
         
+        The package manager picks the kernels itself (installonly_limit),
+        comparing versions properly and never removing the running kernel.
+        
         Returns:
             Dictionary with kernel cleanup results
         """
         try:
-            # Get installed kernels
+            keep = self.config['max_kernels_to_keep']
+            if self.package_manager == 'dnf':
+                cmd = ['sudo', 'dnf', 'remove', '--oldinstallonly', '-y',
+                       f'--setopt=installonly_limit={keep}']
+            elif _have('package-cleanup'):
+                cmd = ['sudo', 'package-cleanup', '--oldkernels', f'--count={keep}', '-y']
+            else:
+                return {'status': 'skipped', 'reason': 'package-cleanup not available'}
+            
             code, stdout, stderr = CommandRunner.run_command(
-                [self.package_manager, 'list', 'installed', 'kernel'],
-                check_return_code=False
+                cmd, timeout=300, check_return_code=False
             )
             
-            if code != 0:
-                return {'status': 'skipped', 'reason': 'Could not list installed kernels'}
-            
-            # Parse kernel list
-            kernels = []
-            lines = stdout.strip().split('\n')
-            for line in lines:
-                if 'kernel.' in line and not line.startswith('Installed'):
-                    parts = line.split()
-                    if len(parts) >= 1:
-                        kernels.append(parts[0])
-            
-            # Keep the most recent kernels
-            if len(kernels) > self.config['max_kernels_to_keep']:
-                kernels_to_remove = kernels[:-self.config['max_kernels_to_keep']]
-                
-                # Remove old kernels
-                cmd = ['sudo', self.package_manager, 'remove', '-y'] + kernels_to_remove
-                code, stdout, stderr = CommandRunner.run_command(cmd, timeout=300)
-                
-                return {
-                    'status': 'success',
-                    'kernels_removed': len(kernels_to_remove),
-                    'kernels_kept': self.config['max_kernels_to_keep'],
-                    'removed_packages': kernels_to_remove
-                }
-            else:
-                return {
-                    'status': 'success',
-                    'kernels_removed': 0,
-                    'note': f"Only {len(kernels)} kernels installed, keeping all"
-                }
+            removed_packages = self._parse_removed_packages(stdout)
+            
+            # dnf exits non-zero when there is nothing old enough to remove
+            if code != 0 and not removed_packages:
+                if 'No old installonly packages' in stdout + stderr:
+                    return {
+                        'status': 'success',
+                        'kernels_removed': 0,
+                        'note': f"No more than {keep} kernels installed, keeping all"
+                    }
+                return {'status': 'failed', 'return_code': code, 'error': stderr.strip()}
+            
+            kernels_removed = sum(1 for package in removed_packages
+                                  if package.rsplit('-', 2)[0] == 'kernel'
+                                  or package.split('.', 1)[0] == 'kernel')
+            return {
+                'status': 'success',
+                'kernels_removed': kernels_removed,
+                'kernels_kept': keep,
+                'removed_packages': removed_packages
+            }
             
         except Exception as e:
             self.logger.warning(f"Could not remove old kernels: {e}")
             return {'status': 'failed', 'error': str(e)}
     
+    @staticmethod
+    def _parse_removed_packages(output: str) -> List[str]:
+        """
+        Extract the packages listed in the "Removed:" section of a transaction.
+        
+        Args:
+            output: dnf/yum transaction output
+            
+        Returns:
+            List of removed package names as printed
+        """
+        removed = []
+        in_section = False
+        for line in output.splitlines():
+            if line.startswith('Removed'):
+                in_section = True
+            elif in_section:
+                if not line.strip() or not line[0].isspace():
+                    break
+                removed.extend(line.split())
+        return removed
+    
     def _check_reboot_required(self) -> bool:
         """
         Check if a reboot is required after updates.
@@ -532,7 +865,7 @@ class FedoraUpdater:
             Boolean indicating if reboot is required
         """
         # Check if needs-restarting command is available
-        if CommandRunner.is_command_available('needs-restarting'):
+        if _have('needs-restarting'):
             try:
                 code, stdout, stderr = CommandRunner.run_command(
                     ['needs-restarting', '-r'],
@@ -542,36 +875,53 @@ class FedoraUpdater:
             except Exception:
                 pass
         
-        # Fallback: check for kernel updates
+        # Fallback: is the newest installed kernel the one running?
         try:
-            current_kernel = os.uname().release
-            code, stdout, stderr = CommandRunner.run_command(
-                [self.package_manager, 'list', 'installed', 'kernel'],
-                check_return_code=False
-            )
-            
-            if code == 0:
-                latest_kernel = None
-                lines = stdout.strip().split('\n')
-                for line in lines:
-                    if 'kernel.' in line:
-                        parts = line.split()
-                        if len(parts) >= 2:
-                            version = parts[1]
-                            if version > (latest_kernel or ''):
-                                latest_kernel = version
-                
-                return latest_kernel and latest_kernel not in current_kernel
+            kernels = self._installed_kernels()
+            if kernels:
+                epoch, version, release, arch = kernels[-1]
+                return f"{version}-{release}.{arch}" != self._kernel_release
             
         except Exception as e:
             self.logger.warning(f"Could not determine reboot requirement: {e}")
         
         return False
     
+    @staticmethod
+    def _installed_kernels() -> List[Tuple[str, str, str, str]]:
+        """
+        List installed kernels from the rpm database, oldest first.
+        
+        With the rpm bindings the database is read in-process and versions
+        are ordered with rpm.labelCompare; otherwise one rpm -q call is made
+        and kernels are ordered by install time.
+        
+        Returns:
+            List of (epoch, version, release, arch) tuples
+        """
+        if HAS_RPM:
+            kernels = [(str(header['epochnum']), header['version'], header['release'], header['arch'])
+                       for header in rpm.TransactionSet().dbMatch('name', 'kernel')]
+            kernels.sort(key=cmp_to_key(lambda a, b: rpm.labelCompare(a[:3], b[:3])))
+            return kernels
+        
+        code, stdout, stderr = CommandRunner.run_command(
+            ['rpm', '-q', '--qf', KERNEL_QUERY_FORMAT, 'kernel'],
+            check_return_code=False
+        )
+        if code != 0:
+            return []
+        
+        rows = [line.split() for line in stdout.splitlines()]
+        rows = [row for row in rows if len(row) == 5]
+        rows.sort(key=lambda row: int(row[0]))
+        
+        return [tuple(row[1:]) for row in rows]
+    
     def _configure_auto_updates(self):
         """Configure automatic updates using dnf-automatic."""
         try:
-            if not CommandRunner.is_command_available('dnf-automatic'):
+            if not _have('dnf-automatic'):
                 self.logger.warning("dnf-automatic not available, cannot configure auto updates")
                 return
             
@@ -592,15 +942,14 @@ class FedoraUpdater:
             self.logger.warning(f"Could not configure automatic updates: {e}")
     
     def _schedule_reboot(self):
-        """Schedule a system reboot."""
+        """Schedule a system reboot through systemd's shutdown scheduler."""
         try:
             reboot_time = self.config['auto_reboot_time']
             self.logger.warning(f"Scheduling system reboot at {reboot_time}")
             
-            # Schedule reboot using at command
+            # shutdown(8) takes HH:MM directly; no shell and no atd needed
             CommandRunner.run_command([
-                'sudo', 'sh', '-c', 
-                f'echo "systemctl reboot" | at {reboot_time}'
+                'sudo', 'shutdown', '-r', reboot_time, 'System reboot for updates'
             ])
             
         except Exception as e:
@@ -609,29 +958,42 @@ class FedoraUpdater:
     def _backup_configs(self):
         """Backup important configuration files before updates."""
         try:
-            backup_dir = f"/tmp/config_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-            os.makedirs(backup_dir, exist_ok=True)
-            
-            # Important files to backup
-            important_files = [
-                '/etc/dnf/dnf.conf',
-                '/etc/yum.conf',
-                '/etc/yum.repos.d/',
-                '/etc/ssh/sshd_config',
-                '/etc/fstab',
-                '/etc/crontab'
-            ]
-            
-            for file_path in important_files:
-                if os.path.exists(file_path):
-                    try:
-                        CommandRunner.run_command([
-                            'sudo', 'cp', '-r', file_path, backup_dir
-                        ])
-                    except Exception as e:
-                        self.logger.warning(f"Could not backup {file_path}: {e}")
-            
-            self.logger.info(f"Configuration backup created in {backup_dir}")
+            existing_files = [path for path in BACKUP_CONFIG_FILES if os.path.exists(path)]
+            if not existing_files:
+                self.logger.warning("No configuration files found to back up")
+                return
+            
+            # One archive, one privileged process; zstd when available. tar
+            # only gained --zstd in 1.31, so hand it the program instead
+            if shutil.which('zstd'):
+                compress_flag, extension = '--use-compress-program=zstd', 'tar.zst'
+            else:
+                compress_flag, extension = '--gzip', 'tar.gz'
+            backup_time = self._cycle_ts or datetime.now()
+            # The archive is written as root and includes root-only files
+            # such as sshd_config, so keep it in a private 0700 directory
+            # rather than directly in the world-readable /tmp
+            backup_dir = tempfile.mkdtemp(prefix='config_backup_')
+            backup_file = os.path.join(
+                backup_dir, f"config_backup_{backup_time.strftime('%Y%m%d_%H%M%S')}.{extension}")
+            
+            # --ignore-failed-read keeps going past unreadable files, warning
+            # on stderr as the per-file copies used to
+            code, stdout, stderr = CommandRunner.run_command(
+                ['sudo', 'tar', '--create', compress_flag, '--file', backup_file,
+                 '--ignore-failed-read'] + existing_files,
+                timeout=60,
+                check_return_code=False
+            )
+            for line in stderr.splitlines():
+                if 'Removing leading' not in line:
+                    self.logger.warning(f"Backup: {line}")
+            
+            if code != 0:
+                self.logger.warning(f"Configuration backup exited with code {code}")
+                return
+            
+            self.logger.info(f"Configuration backup created at {backup_file}")
             
         except Exception as e:
             self.logger.warning(f"Could not create configuration backup: {e}")
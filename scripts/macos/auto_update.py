@@ -143,7 +143,7 @@ class MacOSUpdater:
             # Post-update health check
             if self.config['post_update_health_check']:
                 self.logger.info("Running post-update health check")
-                results['post_update_health'] = self.health_checker.run_all_checks()
+                results['post_update_health'] = self.health_checker.run_all_checks(force=True)
             
         except Exception as e:
             self.logger.error(f"Update cycle failed: {e}")
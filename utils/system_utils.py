@@ -14,8 +14,9 @@ import subprocess
 import sys
 import shutil
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, Dict, List, Tuple
+from typing import Optional, Dict, Iterator, List, Tuple
 
 
 class OSDetector:
@@ -26,6 +27,18 @@ class OSDetector:
         """
         Detect the operating system and distribution.
         
+        Returns:
+            Dict containing os_type, distro, version, and architecture
+        """
+        # Detection is memoized; hand out a copy so callers can't alter it
+        return dict(OSDetector._detect_os_info())
+    
+    @staticmethod
+    @lru_cache(maxsize=1)
+    def _detect_os_info() -> Dict[str, str]:
+        """
+        Perform OS detection once per process.
+        
         Returns:
             Dict containing os_type, distro, version, and architecture
         """
@@ -211,11 +224,15 @@ class LogManager:
 class CommandRunner:
     """Handles safe execution of system commands."""
     
+    # Executables found on PATH, shared across calls; misses are not stored
+    _executable_paths: Dict[str, str] = {}
+    
     @staticmethod
     def run_command(command: List[str], 
                    timeout: int = 300,
                    check_return_code: bool = True,
-                   capture_output: bool = True) -> Tuple[int, str, str]:
+                   capture_output: bool = True,
+                   env: Optional[Dict[str, str]] = None) -> Tuple[int, str, str]:
         """
         Execute a system command safely.
         
@@ -224,6 +241,7 @@ class CommandRunner:
             timeout: Command timeout in seconds
             check_return_code: Whether to raise exception on non-zero exit
             capture_output: Whether to capture stdout/stderr
+            env: Optional variables to set on top of the current environment
             
         Returns:
             Tuple of (return_code, stdout, stderr)
@@ -238,7 +256,9 @@ class CommandRunner:
                 timeout=timeout,
                 capture_output=capture_output,
                 text=True,
-                check=False  # We'll handle return codes manually
+                check=False,  # We'll handle return codes manually
+                env={**os.environ, **env} if env else None,
+                **CommandRunner._spawn_options(command)
             )
             
             logger.debug(f"Command completed with return code: {result.returncode}")
@@ -261,6 +281,91 @@ class CommandRunner:
             logger.error(f"Command not found: {command[0]}")
             raise e
     
+    @staticmethod
+    def _spawn_options(command: List[str]) -> Dict[str, object]:
+        """
+        Build Popen options that let CPython spawn via posix_spawn().
+        
+        CPython only uses posix_spawn() (instead of fork/exec) when the
+        executable is given as a path and close_fds is off. Leaving fds open
+        is safe here because Python creates them non-inheritable (PEP 446).
+        
+        Args:
+            command: Command and arguments as list
+            
+        Returns:
+            Extra keyword arguments for subprocess.run/Popen
+        """
+        if os.name != 'posix' or not command:
+            return {}
+        
+        executable = CommandRunner._resolve_executable(command[0])
+        if executable is None:
+            return {}
+        
+        return {'executable': executable, 'close_fds': False}
+    
+    @staticmethod
+    def _resolve_executable(name: str) -> Optional[str]:
+        """
+        Resolve a command name to an absolute path once per process.
+        
+        Only successful lookups are remembered, so a tool installed while
+        the process runs (e.g. by the update itself) is still found.
+        
+        Args:
+            name: Command name or path
+            
+        Returns:
+            Absolute path to the executable, or None if not found
+        """
+        path = CommandRunner._executable_paths.get(name)
+        if path is None:
+            path = shutil.which(name)
+            if path is None:
+                return None
+            path = os.path.abspath(path)
+            CommandRunner._executable_paths[name] = path
+        return path
+    
+    @staticmethod
+    def stream_lines(command: List[str], env: Optional[Dict[str, str]] = None) -> Iterator[str]:
+        """
+        Execute a command and yield its stdout line by line.
+        
+        Unlike run_command, output is never held in memory as a whole, which
+        keeps peak memory flat for commands that list thousands of items.
+        The return code is not checked.
+        
+        Args:
+            command: Command and arguments as list
+            env: Optional variables to set on top of the current environment
+            
+        Yields:
+            Output lines without trailing newlines
+        """
+        logger = logging.getLogger('system_scripts')
+        logger.debug(f"Streaming command: {' '.join(command)}")
+        
+        process = subprocess.Popen(
+            command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            env={**os.environ, **env} if env else None,
+            **CommandRunner._spawn_options(command)
+        )
+        
+        try:
+            for line in process.stdout:
+                yield line.rstrip('\n')
+        finally:
+            process.stdout.close()
+            if process.poll() is None:
+                process.terminate()
+            process.wait()
+            logger.debug(f"Command completed with return code: {process.returncode}")
+    
     @staticmethod
     def is_command_available(command: str) -> bool:
         """
@@ -307,15 +412,33 @@ class ConfigManager:
         """
         Get the path to a configuration file.
         
+        The lookup is memoized per config name and working directory, as the
+        first location searched is relative to the latter.
+        
+        Args:
+            config_name: Name of the config file
+            
+        Returns:
+            Path to the configuration file
+        """
+        return ConfigManager._find_config_path(config_name, os.getcwd())
+    
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _find_config_path(config_name: str, cwd: str) -> str:
+        """
+        Search the standard locations for a configuration file.
+        
         Args:
             config_name: Name of the config file
+            cwd: Working directory to search first
             
         Returns:
             Path to the configuration file
         """
         # Look for config in standard locations
         search_paths = [
-            os.path.join(os.getcwd(), 'configs', config_name),
+            os.path.join(cwd, 'configs', config_name),
             os.path.join(os.path.dirname(__file__), '..', 'configs', config_name),
             os.path.join('/etc', 'system-scripts', config_name),
             os.path.join(os.path.expanduser('~'), '.config', 'system-scripts', config_name)